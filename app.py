@@ -7,12 +7,44 @@ Scenarios are sector-agnostic, wicked-problem framed, and capture
 the experience of being pulled in multiple directions.
 """
 
+import bisect
+import contextlib
+import csv
+import functools
+import importlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import queue
 import random
+import re
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter, OrderedDict, deque
+import numpy as np
 import streamlit as st
-import plotly.graph_objects as go
-import pandas as pd
-import requests
+import streamlit.components.v1 as components
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
+# pandas, plotly, pyarrow and requests are imported where they are first
+# needed (facilitator tables, charts, Parquet export, the Sheets worker), so
+# a cold process paints the welcome page without loading them.
+
+import psychometrics
+from diagnostic import (
+    BANK as DEFAULT_BANK, BANK_DIR, BANK_EXTS, DIM_KEYS, Bank, bank_by_digest, scan_banks,
+    APP_DIR, MAX_SCORE, score_tier, html_report, html_reports, content_digest,
+    svg_radar, svg_radar_bands,
+)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # PAGE CONFIG
@@ -26,539 +58,1013 @@ st.set_page_config(
 
 FACILITATOR_PASSWORD = "mbx2026"
 
+def _secret(key, default=None):
+    try:
+        return st.secrets.get(key, default)
+    except Exception:
+        return default
+
+def _flag(key, default=False) -> bool:
+    """An on/off secret: true/1/yes/on (any case) is on, so "false" or "0" from the environment stays off."""
+    return str(_secret(key, default)).strip().lower() in {"1", "true", "yes", "on"}
+
+# ─────────────────────────────────────────────────────────────────────────────
+# PROFILING
+# Opt-in with PROFILING = true. Page functions and hot helpers are wrapped
+# in wall-clock timers feeding per-section histograms shared by every
+# session: cumulative Prometheus-style buckets plus the last WINDOW samples
+# for percentiles. When off, timed() hands back the undecorated function
+# and span() a shared null context, so nothing runs per call.
+# ─────────────────────────────────────────────────────────────────────────────
+PROFILING = _flag("PROFILING")
+
+class Profiler:
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    WINDOW  = 512
+
+    def __init__(self, trace_memory: bool = False):
+        self._lock      = threading.Lock()
+        self._sections  = {}   # name -> [bucket counts (+Inf last), count, sum, recent samples]
+        self._snapshot  = None
+        self._exported  = 0.0
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            sec = self._sections.get(name)
+            if sec is None:
+                sec = self._sections[name] = [[0] * (len(self.BUCKETS) + 1), 0, 0.0,
+                                              deque(maxlen=self.WINDOW)]
+            sec[0][bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            sec[1] += 1
+            sec[2] += seconds
+            sec[3].append(seconds)
+
+    def clear(self):
+        with self._lock:
+            self._sections.clear()
+
+    def summary(self) -> list:
+        """One row per section: calls, total seconds and recent mean / p50 / p95 / max in ms."""
+        with self._lock:
+            items = [(name, sec[1], sec[2], np.array(sec[3])) for name, sec in self._sections.items()]
+        out = []
+        for name, count, total, recent in sorted(items, key=lambda it: -it[2]):
+            p50, p95 = np.percentile(recent, [50, 95]) * 1000
+            out.append({"section": name, "calls": count, "total_s": total,
+                        "mean_ms": recent.mean() * 1000, "p50_ms": p50, "p95_ms": p95,
+                        "max_ms": recent.max() * 1000})
+        return out
+
+    def memory_snapshot(self, top: int = 15) -> list:
+        """Top allocation sites by growth since the previous snapshot (by size on the first)."""
+        snap = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),))
+        prev, self._snapshot = self._snapshot, snap
+        stats = snap.compare_to(prev, "lineno") if prev else snap.statistics("lineno")
+        return [{"site": str(s.traceback), "size_kb": s.size / 1024,
+                 "change_kb": getattr(s, "size_diff", s.size) / 1024, "blocks": s.count}
+                for s in stats[:top]]
+
+    def prometheus(self) -> str:
+        """Text exposition format: one histogram with a section label, plus traced memory."""
+        lines = ["# HELP bc_section_seconds Wall time spent in instrumented sections of the app.",
+                 "# TYPE bc_section_seconds histogram"]
+        with self._lock:
+            for name, (buckets, count, total, _) in sorted(self._sections.items()):
+                cum = 0
+                for le, n in zip(self.BUCKETS + ("+Inf",), buckets):
+                    cum += n
+                    lines.append(f'bc_section_seconds_bucket{{section="{name}",le="{le}"}} {cum}')
+                lines.append(f'bc_section_seconds_sum{{section="{name}"}} {total:.6f}')
+                lines.append(f'bc_section_seconds_count{{section="{name}"}} {count}')
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines += ["# HELP bc_traced_memory_bytes Memory allocated by Python, as seen by tracemalloc.",
+                      "# TYPE bc_traced_memory_bytes gauge",
+                      f'bc_traced_memory_bytes{{kind="current"}} {current}',
+                      f'bc_traced_memory_bytes{{kind="peak"}} {peak}']
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str, every: float = 15.0):
+        """Rewrite *path* (e.g. for node_exporter's textfile collector) at most every *every* seconds."""
+        now = time.monotonic()
+        with self._lock:   # reruns reaching the boundary together: one of them writes
+            if now - self._exported < every:
+                return
+            self._exported = now
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".")
+        try:
+            os.fchmod(fd, 0o644)   # mkstemp's 0600 would hide it from a collector running as another user
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+
+
 @st.cache_resource
-def get_class_store():
-    return []
+def get_profiler():
+    return Profiler(trace_memory=_flag("PROFILE_TRACEMALLOC"))
 
-def submit_to_sheets(row: dict) -> bool:
+def timed(name: str):
+    """Decorator recording each call's wall time under *name*; returns *fn* untouched when profiling is off."""
+    def wrap(fn):
+        if not PROFILING:
+            return fn
+        prof = get_profiler()
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.record(name, time.perf_counter() - t0)
+        return inner
+    return wrap
+
+@contextlib.contextmanager
+def _span(prof, name):
+    t0 = time.perf_counter()
     try:
-        url = st.secrets.get("GOOGLE_SHEET_URL", "")
-        if not url:
-            return False
-        r = requests.post(url, json=row, timeout=8)
-        return r.status_code == 200
-    except Exception:
-        return False
+        yield
+    finally:
+        prof.record(name, time.perf_counter() - t0)
+
+_NO_SPAN = contextlib.nullcontext()
+
+def span(name: str):
+    """Context manager timing an inline block under *name*."""
+    return _span(get_profiler(), name) if PROFILING else _NO_SPAN
 
 # ─────────────────────────────────────────────────────────────────────────────
-# DIMENSIONS
+# SCENARIO BANK
+# The newest valid file in SCENARIO_BANK_DIR (default bank/) is the active
+# bank. The directory is re-checked at most every BANK_POLL seconds — one
+# stat per file — so an edited or added file goes live without a restart.
+# A file that fails validation, or that changes the dimension keys the class
+# store is laid out on, is listed in the facilitator view and the previous
+# bank stays active. Each attempt pins the bank it began on (its content hash
+# is checkpointed with the quiz), so in-flight sessions finish on the wording
+# and scoring they started with.
 # ─────────────────────────────────────────────────────────────────────────────
-DIMENSIONS = {
-    "awareness": {
-        "name": "Boundary Awareness",
-        "icon": "🔍",
-        "color": "#2563EB",
-        "tagline": "Noticing and naming the tensions that shape your work",
-        "feedback": [
-            "You tend to treat boundary signals as operational problems rather than relational or structural ones. The habit of pausing to ask 'what kind of problem is this, really?' can open up options that task-focused responses miss.",
-            "You notice tensions in familiar contexts. The growth edge is naming them explicitly — even when doing so creates discomfort, slows things down, or makes you the person who complicates a situation others want to move past quickly.",
-            "You have a well-developed capacity to identify and articulate the invisible lines shaping your work. Consider how you help others develop this awareness — naming boundaries is a leadership act, not just a personal skill.",
-            "You notice boundaries early, name them precisely, and treat them as collective learning opportunities rather than individual inconveniences. This is a rare and high-value leadership capability in complex, ambiguous environments.",
-        ],
-    },
-    "coordination": {
-        "name": "Coordination",
-        "icon": "🤝",
-        "color": "#10B981",
-        "tagline": "Building bridges, shared structures, and lasting routines",
-        "feedback": [
-            "You tend to coordinate through informal means — relationships, goodwill, and individual effort. These work until they don't. When the people who hold informal knowledge leave or are unavailable, coordination breaks down. Lightweight shared structures can make your team's work more resilient without adding bureaucracy.",
-            "You create coordination fixes when friction becomes visible. The shift toward designing coordination proactively — before problems surface — is where significant capacity gains tend to come from.",
-            "You build effective coordination structures and help others work through shared systems. Check that the structures you create are genuinely owned by the team rather than dependent on your continued involvement to function.",
-            "You design coordination as infrastructure — systems, norms, and shared artefacts that outlast any individual and create the conditions for sustained cross-boundary work. You understand that the goal is a team that coordinates without you, not one that coordinates through you.",
-        ],
-    },
-    "reflection": {
-        "name": "Reflective Capacity",
-        "icon": "🪞",
-        "color": "#F59E0B",
-        "tagline": "Learning about yourself through encounters with difference",
-        "feedback": [
-            "Boundary encounters carry information about your assumptions — but only if you examine them rather than explain them away. Even a short reflective pause after a difficult encounter can surface patterns that would otherwise remain invisible.",
-            "You reflect when prompted or when something goes wrong. Building reflection into your regular rhythm — not just reactively — allows you to extract more learning from ordinary experience rather than waiting for things to break.",
-            "You treat encounters with difference as genuine learning material and are willing to sit with uncomfortable questions about your own assumptions and patterns. This capacity for honest self-examination is a significant leadership strength.",
-            "You treat your own reactions as data, share your reflections with others when it creates learning, and create conditions for collective sense-making. You understand that reflective leadership is not just about looking inward — it's about what you do with what you find.",
-        ],
-    },
-    "transformation": {
-        "name": "Transformative Practice",
-        "icon": "✨",
-        "color": "#8B5CF6",
-        "tagline": "Generating new knowledge and practice through crossing",
-        "feedback": [
-            "Your boundary crossings may not yet be generating new practice. The question is not just 'how do I manage this tension?' but 'what could emerge here that didn't exist before?' That shift in frame is the first step toward transformative work.",
-            "You occasionally generate new insights from boundary encounters. The next step is treating these insights as deliberately as you treat operational problems — scoping experiments, involving others, and creating conditions for what you've learned to travel.",
-            "You actively create conditions for new practice to emerge. You know how to scope experiments, hold ambiguity, and document learning in ways that can be shared. Your challenge is ensuring that what you create doesn't stay within your immediate sphere.",
-            "You are not just crossing boundaries — you are transforming practices on both sides. You treat every significant boundary encounter as a potential site of institutional learning, and you build the conditions for that learning to persist beyond you.",
-        ],
-    },
-}
+class BankWatcher:
+    def __init__(self, directory: str, poll: float):
+        self._dir   = directory
+        self._poll  = poll
+        self._lock  = threading.Lock()
+        self._sig   = None
+        self._due   = 0.0
+        self.active = DEFAULT_BANK
+        self.errors = {}   # file or version -> why it is not in use
+        self.current()
 
-LEVEL_LABELS = {
-    "systemic":   "🏛 Systemic",
-    "team":       "👥 Team",
-    "leader_sub": "🧑‍💼 Leader–Subordinate",
-    "mindset":    "🧠 Individual Mindset",
-    "technology": "💻 Technology",
-}
+    def _signature(self):
+        try:
+            return tuple(sorted((e.name, e.stat().st_mtime_ns, e.stat().st_size)
+                                for e in os.scandir(self._dir) if e.name.endswith(BANK_EXTS)))
+        except OSError:
+            return None
+
+    def current(self) -> Bank:
+        now = time.monotonic()
+        if now >= self._due and self._lock.acquire(blocking=False):
+            try:
+                self._due = now + self._poll
+                sig = self._signature()
+                if sig != self._sig:
+                    self._sig = sig
+                    self._reload()
+            finally:
+                self._lock.release()
+        return self.active
+
+    def _reload(self):
+        try:
+            banks, errors = scan_banks(self._dir)
+        except OSError as e:
+            banks, errors = [], {self._dir: str(e)}
+        usable = [b for b in banks if b.dim_keys == DIM_KEYS]
+        for b in banks:
+            if b.dim_keys != DIM_KEYS:
+                errors[f"version {b.version}"] = (f"version {b.version}: changes the dimension keys, "
+                                                  f"which needs a restart")
+        if usable:
+            self.active = usable[-1]
+        self.errors = errors
+
+
+@st.cache_resource
+def get_bank_watcher():
+    return BankWatcher(_secret("SCENARIO_BANK_DIR", BANK_DIR), float(_secret("BANK_POLL", 2)))
+
+def active_bank() -> Bank:
+    return get_bank_watcher().current()
+
+def session_bank() -> Bank:
+    """The bank this attempt began on; the active bank before one begins."""
+    return bank_by_digest(st.session_state.get("bank")) or active_bank()
+
+BANK       = active_bank()   # for this rerun's class-wide views; participants use session_bank()
+DIMENSIONS = BANK.dimensions
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 20 SJT SCENARIOS
-# Options listed in randomised developmental order (not Emerging→Advanced)
-# to reduce obvious gaming. Each option carries its score as metadata.
+# CLASS AGGREGATES
+# Running count, sum, sum of squares, min, max and a 0–20 score histogram per
+# class_code and dimension, folded in as submissions arrive, plus the
+# submissions and adaptive-skipped scenarios per class_code and scenario bank.
+# The dashboard reads means, spreads, quantiles and items saved from here in
+# O(1) instead of rescanning every submission.
 # ─────────────────────────────────────────────────────────────────────────────
-SCENARIOS = [
-
-    # ── BOUNDARY AWARENESS ──────────────────────────────────────────────────
-
-    {
-        "id": "A1", "dim": "awareness", "level": "systemic",
-        "title": "The Merge That Wasn't",
-        "context": (
-            "Your organisation recently brought two previously separate teams under your management. "
-            "On paper, integration is complete. In practice, the teams operate as if they are still separate — "
-            "different rhythms, different assumptions about what good work looks like, quiet loyalties to the old structure. "
-            "You are expected to show that the integration is working. "
-            "Leadership has moved on. The teams haven't."
-        ),
-        "prompt": "You are pulled between demonstrating progress and addressing what you're actually seeing. What do you do?",
-        "options": [
-            ("Focus on outputs and deliverables — cultural integration takes time and cannot be rushed or forced.", 1),
-            ("Notice the division but wait for a natural opportunity to address it without creating disruption.", 2),
-            ("Name the dynamic explicitly with both groups: 'We're technically one team but operating as two — I think that's worth examining together.'", 3),
-            ("Facilitate a structured integration process — surfacing the different working assumptions, identifying where they create friction, and co-designing what a genuinely shared team culture would look like.", 4),
-        ],
-    },
-    {
-        "id": "A2", "dim": "awareness", "level": "team",
-        "title": "The Same Goal, Different Games",
-        "context": (
-            "Your project team has been working together for three months. On the surface, everyone is aligned. "
-            "Underneath, you notice each person is optimising for something slightly different — "
-            "some for speed, some for quality, some for how the work reflects on their own team, some for their manager's priorities. "
-            "No one has said any of this aloud. The team appears collaborative but moves slowly. "
-            "When things stall, each person has a different explanation for why."
-        ),
-        "prompt": "Naming this risks making people defensive. Not naming it means the friction continues. What do you do?",
-        "options": [
-            ("Name what you observe in a team session: 'I think we might be optimising for different things without realising it — can we make that visible?'", 3),
-            ("Keep moving — teams working on complex problems naturally find alignment as the deadline focuses minds.", 1),
-            ("Have quiet individual conversations with the people you trust most to understand what's really going on.", 2),
-            ("Facilitate a structured conversation to map each person's actual success criteria, surface the tensions, and renegotiate shared priorities before the friction compounds.", 4),
-        ],
-    },
-    {
-        "id": "A3", "dim": "awareness", "level": "leader_sub",
-        "title": "The Brief That Was Never Enough",
-        "context": (
-            "A capable team member consistently delivers work that meets every explicit requirement "
-            "but misses what the context actually demands — the political undercurrents, the unstated expectations, "
-            "the real concerns of the people the work is for. "
-            "When you give feedback, they are genuinely confused. From where they stand, they did exactly what was asked. "
-            "You can feel the gap but struggle to articulate it precisely. "
-            "And you wonder whether the problem is theirs, yours, or somewhere in between."
-        ),
-        "prompt": "The feedback feels like moving goalposts to them, and maybe it is. What do you do?",
-        "options": [
-            ("Treat this as a communication problem and be more explicit in briefs going forward.", 1),
-            ("Acknowledge to yourself that there is a gap in how you each read the work, but assume it will narrow with experience.", 2),
-            ("Have a direct conversation about the unspoken expectations you carry — naming what has been implicit and examining whether those expectations are reasonable to hold unstated.", 3),
-            ("Treat this as a boundary worth examining together — discuss the different mental models you each bring to the work, and co-create a shared framework for what 'reading the context' actually requires.", 4),
-        ],
-    },
-    {
-        "id": "A4", "dim": "awareness", "level": "mindset",
-        "title": "The Frustration You Keep Explaining Away",
-        "context": (
-            "You leave a recurring cross-team meeting feeling a familiar low-grade frustration. "
-            "The right things are being reported. Progress is visible. The room is professionally cordial. "
-            "But something consistently feels off — like the real issues are being managed around rather than addressed. "
-            "Later, you find yourself wondering whether the problem is the meeting format, the other people, "
-            "or something you're not doing, not saying, or not seeing in yourself."
-        ),
-        "prompt": "It's easier to attribute the feeling to external causes. What do you do?",
-        "options": [
-            ("Accept the frustration as a normal feature of cross-functional work — some meetings are just like this.", 1),
-            ("Acknowledge the frustration privately and decide to raise the meeting format at an appropriate moment.", 2),
-            ("Sit with the discomfort long enough to examine your own role — what are you avoiding saying, and what might you be contributing to the dynamic you're frustrated by?", 3),
-            ("Use the experience as diagnostic data — examine your own reactions, discuss with a trusted peer, and consider what the pattern might reveal about assumptions you carry into that room.", 4),
-        ],
-    },
-    {
-        "id": "A5", "dim": "awareness", "level": "technology",
-        "title": "The Tool You Keep Overruling",
-        "context": (
-            "Your organisation has invested in a system that surfaces patterns and anomalies your team "
-            "would not typically generate on their own. Six months in, you notice the team consistently "
-            "sets aside its outputs — sometimes for good contextual reasons, sometimes reflexively, "
-            "and sometimes, you suspect, because the outputs are uncomfortable. "
-            "The boundary between legitimate professional judgment and defensive habit "
-            "is not clear, and no one has tried to draw it."
-        ),
-        "prompt": "Both the tool and your team's judgment have real value. What do you do?",
-        "options": [
-            ("Trust the team — they have contextual knowledge the tool doesn't, and second-guessing them undermines confidence.", 1),
-            ("Encourage the team to engage more thoughtfully with the outputs, but leave it to their discretion.", 2),
-            ("Name the pattern explicitly: 'I notice we consistently set aside the tool's outputs — I'd like us to examine whether we're making deliberate judgments or forming a habit of dismissal.'", 3),
-            ("Facilitate a structured review of recent cases where the tool was overridden — asking the team to articulate their reasoning and using this to surface the unexamined assumptions about expertise, risk, and what counts as reliable knowledge.", 4),
-        ],
-    },
-
-    # ── COORDINATION ─────────────────────────────────────────────────────────
-
-    {
-        "id": "C1", "dim": "coordination", "level": "systemic",
-        "title": "No One's Problem, Everyone's Problem",
-        "context": (
-            "You are co-leading a significant initiative with a peer from another part of the organisation. "
-            "Both of you have partial authority, complementary expertise, and completely different teams, "
-            "timelines, and reporting lines. "
-            "The work keeps stalling at the points where your domains meet — "
-            "not because of conflict, but because neither of you is sure whose call it is. "
-            "Both of you are too stretched to resolve it cleanly. "
-            "Escalating feels like admitting failure. Continuing without resolving it is slowly killing the project."
-        ),
-        "prompt": "You are pulled between momentum and clarity. What do you do?",
-        "options": [
-            ("Keep moving and resolve ambiguities case by case — escalating ownership questions creates more problems than it solves.", 1),
-            ("Raise the issue with your peer informally and agree to check in more frequently on the friction points.", 2),
-            ("Design a simple shared structure — clear decision rights, a brief joint escalation path, and a regular rhythm for surfacing issues before they stall the work.", 3),
-            ("Treat the coordination failure as a design problem — co-create a governance structure that both teams understand, that clarifies who owns what, and that creates visible mechanisms for resolving ambiguity without escalating every time.", 4),
-        ],
-    },
-    {
-        "id": "C2", "dim": "coordination", "level": "team",
-        "title": "The Meeting That Has Become Theatre",
-        "context": (
-            "Your team meets regularly. Updates are shared. Actions are logged. "
-            "The same issues reappear at the next meeting in slightly different form. "
-            "Real decisions happen in corridors, in direct messages, in conversations you're not in. "
-            "The formal meeting has become a place where things are reported rather than resolved. "
-            "Everyone is polite. No one has named what is happening. "
-            "You are not sure whether naming it would help or make things worse."
-        ),
-        "prompt": "The dysfunction is functional enough that no one is demanding change. What do you do?",
-        "options": [
-            ("Continue as is — the informal channels are actually working, and disrupting the formal structure risks the whole system.", 1),
-            ("Restructure the agenda to focus on decisions rather than updates and see whether that shifts the dynamic.", 2),
-            ("Name the pattern directly with the team: 'I think our meetings have become more about reporting than resolving — I'd like to change that, and I'd like your help designing something better.'", 3),
-            ("Facilitate a genuine conversation about what coordination actually requires in your current context — then co-design a new structure, including explicit norms about where decisions should happen and how the informal network connects to the formal one.", 4),
-        ],
-    },
-    {
-        "id": "C3", "dim": "coordination", "level": "leader_sub",
-        "title": "The Knowledge No One Else Has",
-        "context": (
-            "The most important knowledge in your team — who to go to, what the real constraints are, "
-            "how to read the key people, which battles are worth fighting — "
-            "lives in your head and in a small number of informal relationships. "
-            "It works. You get things done others can't. "
-            "But you've started noticing that when you're unavailable, things slow to a halt. "
-            "Newer team members can't navigate independently. "
-            "You are, without intending it, a bottleneck."
-        ),
-        "prompt": "Your knowledge is a source of genuine value. Making it explicit changes your role. What do you do?",
-        "options": [
-            ("Continue as is — this kind of knowledge can't really be documented, and the relationships took years to build.", 1),
-            ("Brief a deputy more comprehensively so the team can function when you're not available.", 2),
-            ("Begin systematically externalising the knowledge — documenting key relationships, context, and judgment calls in shared formats the team can access and build on.", 3),
-            ("Treat this as a structural problem worth redesigning — map what knowledge exists where, who needs it, and co-create a system that distributes context and decision-making capacity across the team rather than concentrating it in you.", 4),
-        ],
-    },
-    {
-        "id": "C4", "dim": "coordination", "level": "mindset",
-        "title": "The Coordinator Who Can't Be Absent",
-        "context": (
-            "You have built your effectiveness on knowing the right people and being trusted across teams. "
-            "You get things done that others cannot because of relationship capital accumulated over years. "
-            "But the same quality that makes you effective also means that "
-            "when you are not in the room, the connections don't hold. "
-            "You've started to wonder whether you have built a team that works through you "
-            "rather than one that works without you — and whether that distinction matters."
-        ),
-        "prompt": "The relationship approach is genuinely valuable and genuinely limiting. What do you do?",
-        "options": [
-            ("Continue as is — relationship-based coordination is a real leadership skill, and the team values what you bring.", 1),
-            ("Introduce more structure to the most critical coordination points so the team is less dependent on your personal involvement.", 2),
-            ("Reflect honestly on which coordination tasks rely on your personal relationships and begin building shared processes that could work without you at the centre.", 3),
-            ("Treat your own effectiveness as a design problem — map your relational capital, understand what the team can and cannot do without you, and deliberately build their coordination capacity as a leadership priority.", 4),
-        ],
-    },
-    {
-        "id": "C5", "dim": "coordination", "level": "technology",
-        "title": "Everything Is Somewhere",
-        "context": (
-            "Your team has accumulated a patchwork of tools, drives, channels, and trackers "
-            "— each introduced to solve a specific problem, none of them integrated. "
-            "Information is duplicated across platforms. "
-            "Decisions made in one channel are invisible to people in another. "
-            "New members spend weeks just working out where things live. "
-            "Everyone acknowledges it is a problem. "
-            "No one has the time, authority, or appetite to fix it properly — "
-            "and every partial fix has historically made things slightly more complicated."
-        ),
-        "prompt": "The system is broken in a way that feels too embedded to change. What do you do?",
-        "options": [
-            ("Let individuals use whatever tools work for them — trying to standardise creates resistance and makes you responsible for a system no one will maintain.", 1),
-            ("Propose a simpler setup and encourage the team to migrate, but don't mandate it.", 2),
-            ("Facilitate a team audit of current tool usage and co-design a clear technology charter: which tool serves which purpose, and how the team will maintain the agreement.", 3),
-            ("Treat the tool sprawl as a symptom of a coordination design problem — map the actual workflows, identify where information needs to flow, design the simplest possible system that serves those needs, and build in a regular review so the system evolves rather than accumulates.", 4),
-        ],
-    },
-
-    # ── REFLECTIVE CAPACITY ──────────────────────────────────────────────────
-
-    {
-        "id": "R1", "dim": "reflection", "level": "systemic",
-        "title": "Between Loyalty and What You Actually Think",
-        "context": (
-            "A significant strategic decision has been made above you that you are now expected to implement and advocate for. "
-            "You have real reservations — not because you think it is simply wrong, "
-            "but because you can see consequences that may not have been fully considered, "
-            "and the people most affected had the least voice in the decision. "
-            "You are being pulled between institutional loyalty, personal integrity, "
-            "and your responsibility to the people you lead. "
-            "There is no clean option."
-        ),
-        "prompt": "Speaking up has costs. Staying silent has different costs. What do you do?",
-        "options": [
-            ("Implement as directed — it is not your role to second-guess decisions made above you, and visible reservation undermines the organisation.", 1),
-            ("Implement while noting your reservations privately and monitoring what happens.", 2),
-            ("Implement while raising your concerns through the appropriate channels — documenting your perspective clearly and ensuring the people most affected have some form of voice in the process.", 3),
-            ("Implement with integrity — facilitate a conversation with your team about what it means to carry out a decision you have reservations about, surface the tensions honestly, and create structured mechanisms to feed back what you observe to the decision-makers.", 4),
-        ],
-    },
-    {
-        "id": "R2", "dim": "reflection", "level": "team",
-        "title": "The Gap Between Intention and Impact",
-        "context": (
-            "After a demanding period of work, informal feedback reaches you that your team experienced "
-            "your leadership as controlling — that they felt directed rather than trusted, managed rather than developed. "
-            "Your own experience of that period was of holding things together under significant pressure. "
-            "You believed you were protecting the team. "
-            "They experienced something different. "
-            "The gap between your intention and their experience is wider than you knew, "
-            "and you are not entirely sure what to do with that."
-        ),
-        "prompt": "The defensive impulse is strong. The feedback may be partly unfair. It may also be true. What do you do?",
-        "options": [
-            ("Note the feedback and attribute it to the pressure of the period — you know what that situation required and would make the same calls again.", 1),
-            ("Reflect privately and resolve to give the team more autonomy when conditions allow.", 2),
-            ("Follow up with the people who gave feedback — ask for specific examples, share your own account of the period, and try to understand the gap between what you intended and what they experienced.", 3),
-            ("Create a structured debrief with the team — share what you heard without defensiveness, own the impact regardless of intention, explore the gap honestly, and co-design what you want the working relationship to look like going forward.", 4),
-        ],
-    },
-    {
-        "id": "R3", "dim": "reflection", "level": "leader_sub",
-        "title": "What the Departure Revealed",
-        "context": (
-            "Someone you valued highly has decided to leave. "
-            "In the conversation before they go, they tell you something honest you weren't expecting: "
-            "that they stopped growing under you — that you consistently gave them work they were already good at "
-            "rather than work that would stretch them. "
-            "You believed you were deploying them well. They experienced being held in place. "
-            "You can't act on this feedback — they're leaving. "
-            "But you find yourself wondering how many other people on your team feel the same way "
-            "and haven't said anything."
-        ),
-        "prompt": "The feedback is too late to act on for this person. What do you do with it?",
-        "options": [
-            ("Accept it graciously and note it for future reference — every manager has blind spots and this was one of yours.", 1),
-            ("Reflect on whether you relied on this person too heavily and resolve to be more deliberate about development conversations with the team.", 2),
-            ("Sit with the discomfort — examine your assumptions about what development actually means, and whether you have been prioritising team stability, your own comfort, or what was genuinely best for the individuals.", 3),
-            ("Use this as a catalyst for genuine inquiry — have development conversations with your current team members, examine your own defaults around stretch versus safety, and ask yourself what you would need to change about how you lead for people to grow.", 4),
-        ],
-    },
-    {
-        "id": "R4", "dim": "reflection", "level": "mindset",
-        "title": "The Voice You Keep Not Using",
-        "context": (
-            "In rooms with senior or influential people, you consistently hold back. "
-            "You soften your actual view, hedge your assessment, wait for someone else to say what you're thinking. "
-            "Afterwards, you often leave with the thought that you should have said more. "
-            "The pattern is familiar — it has been present for years. "
-            "You have explanations for it: reading the room, professional judgment, picking battles, respecting hierarchy. "
-            "Some of those explanations feel true. "
-            "But something about the pattern still troubles you, "
-            "and you notice it is costing you in ways you haven't fully named."
-        ),
-        "prompt": "The explanations feel real but the pattern continues. What do you do?",
-        "options": [
-            ("Continue exercising professional judgment about when to speak — the pattern reflects contextual intelligence, not a problem.", 1),
-            ("Acknowledge the pattern privately and look for lower-stakes opportunities to practise speaking more directly.", 2),
-            ("Examine the assumptions underneath the pattern — what exactly are you afraid of, when does deference serve the work and when does it protect you, and what is the cost of staying silent?", 3),
-            ("Treat this as a genuine leadership edge — explore the roots of the pattern with a coach or trusted peer, practise deliberately in situations that feel safe enough to stretch, and build a personal strategy for navigating the tension between voice and deference.", 4),
-        ],
-    },
-    {
-        "id": "R5", "dim": "reflection", "level": "technology",
-        "title": "When the Tool Does It Better",
-        "context": (
-            "Your team has integrated an AI tool into a core workflow. "
-            "The outputs are often strong — sometimes stronger than what the team would produce independently. "
-            "Review processes have become more cursory. "
-            "People are beginning to trust the tool's judgment over their own in certain situations. "
-            "You feel a professional unease you are struggling to articulate precisely. "
-            "It isn't that the tool is wrong. "
-            "It's something about the direction of the dependency, "
-            "and what it might be quietly doing to the team's capacity to think."
-        ),
-        "prompt": "The tool is genuinely useful. The unease is real but hard to name. What do you do?",
-        "options": [
-            ("Accept this as a natural feature of good tool adoption — if the outputs are strong, lighter review is efficient, not a problem.", 1),
-            ("Mention to the team that they should stay engaged with the outputs critically, without making it a bigger issue.", 2),
-            ("Name your unease explicitly and open a conversation: 'I want to examine what it means for our professional judgment and accountability when a tool consistently produces work we would be proud to have done ourselves.'", 3),
-            ("Facilitate a genuine team inquiry — what does the tool change about how you think, what you're responsible for, and what expertise means in your context? Develop a shared position on what good human–AI collaboration looks like for your team specifically.", 4),
-        ],
-    },
-
-    # ── TRANSFORMATIVE PRACTICE ──────────────────────────────────────────────
-
-    {
-        "id": "T1", "dim": "transformation", "level": "systemic",
-        "title": "The Group That Produces Nothing New",
-        "context": (
-            "You sit on a cross-organisational working group that has existed for two years. "
-            "Meetings are well-attended. Reports are produced. "
-            "Both organisations use participation in the group to demonstrate collaboration "
-            "without being genuinely changed by it. "
-            "Real decisions happen elsewhere. "
-            "The group's continued existence may be preventing more honest conversations "
-            "about why the deeper collaboration isn't happening. "
-            "No one else seems willing to name this. "
-            "And naming it has costs."
-        ),
-        "prompt": "Staying costs something. Disrupting it costs something else. What do you do?",
-        "options": [
-            ("Continue participating — institutional structures like this are slow to change and leaving would remove any chance of influence.", 1),
-            ("Raise the question of the group's effectiveness at the next meeting and propose a mandate review.", 2),
-            ("Propose a fundamental shift in what the group does — from reporting to genuine joint problem-solving, with a specific shared challenge as the test case.", 3),
-            ("Facilitate a reckoning with what the group is actually for — name the performance openly, invite an honest conversation about what genuine collaboration would require from both sides, and redesign from that honesty rather than around it.", 4),
-        ],
-    },
-    {
-        "id": "T2", "dim": "transformation", "level": "team",
-        "title": "The Better Way No One Else Knows",
-        "context": (
-            "Over eighteen months of iteration and learning from failure, "
-            "your team has developed a significantly better approach to a recurring challenge. "
-            "It works. The evidence is clear. "
-            "But it exists only within your team. "
-            "You haven't documented it, shared it, or tried to spread it. "
-            "Partly because you're busy. Partly because you're not sure others would value it. "
-            "And partly — if you're honest — because it has become part of what makes your team distinctive, "
-            "and you're not certain you want to give that away."
-        ),
-        "prompt": "Sharing it changes your team's position. Not sharing it keeps a gap between knowing and doing. What do you do?",
-        "options": [
-            ("Continue as is — the approach took years to develop, and it's not your responsibility to do others' learning for them.", 1),
-            ("Mention it to peers informally and let genuine interest develop naturally before investing in any formal sharing.", 2),
-            ("Document the approach clearly and share it with leadership, proposing a structured pilot with one other team.", 3),
-            ("Treat what you've built as a shared resource — create a transferable version of the methodology, run a cross-team learning session, and actively help others adapt it to their contexts, including being honest about the eighteen months of failure that preceded success.", 4),
-        ],
-    },
-    {
-        "id": "T3", "dim": "transformation", "level": "leader_sub",
-        "title": "The Idea You Almost Dismissed",
-        "context": (
-            "A team member brings you an unconventional proposal for a problem your organisation "
-            "has been circling for years without resolving. "
-            "The idea sits outside standard parameters. "
-            "Your first instinct is to explain the obstacles — the process, the timing, the risk. "
-            "The instinct comes quickly. "
-            "But something about the idea is more interesting than the instinct wants to acknowledge, "
-            "and you notice you're not entirely sure whether your caution is protecting the team member "
-            "or protecting yourself."
-        ),
-        "prompt": "The idea may be worth more than your first instinct suggests. What do you do?",
-        "options": [
-            ("Thank them for the thinking and redirect their energy toward more viable approaches — protecting them from a costly, demoralising failure is part of your job.", 1),
-            ("Explore the idea with them informally and be honest about the obstacles, leaving it to them to decide whether to pursue it.", 2),
-            ("Work with them to scope a low-risk version of the proposal — small enough to test the core idea without requiring approval for the full thing.", 3),
-            ("Treat this as a leadership opportunity — sit with your own first instinct long enough to examine it, co-develop the proposal seriously, coach them through the organisational landscape, and create conditions for a genuine test regardless of what you predict the outcome to be.", 4),
-        ],
-    },
-    {
-        "id": "T4", "dim": "transformation", "level": "mindset",
-        "title": "The Expert Who Must Become Something Else",
-        "context": (
-            "You built your career and your credibility on knowing more than others in your domain — "
-            "being the person with the answer, the one who sets direction, the one others come to. "
-            "Your current role requires something different: "
-            "facilitating rather than directing, creating conditions for others to think, "
-            "being genuinely comfortable with outcomes you didn't design. "
-            "The shift is harder than you expected. "
-            "And you are not always sure whether the moments you reach for the expert role "
-            "are genuinely necessary or a way of managing your own discomfort with the uncertainty."
-        ),
-        "prompt": "Your expertise is real. So is the discomfort. What do you do?",
-        "options": [
-            ("Lead from expertise — it is what your team expects and what you are genuinely best at, and this version of 'facilitative leadership' is often just less effective leadership.", 1),
-            ("Try facilitative approaches in some situations while defaulting to direction when pressure is high or the stakes are significant.", 2),
-            ("Name the shift explicitly — with yourself and your team — and experiment deliberately with facilitative approaches, tracking what you learn about your own range and what the team is capable of when you get out of the way.", 3),
-            ("Treat the discomfort as a developmental signal worth taking seriously — design a sustained personal experiment with real reflection built in (journalling, peer coaching, supervision), and commit to examining the patterns honestly enough to change them.", 4),
-        ],
-    },
-    {
-        "id": "T5", "dim": "transformation", "level": "technology",
-        "title": "Not Faster — Different",
-        "context": (
-            "Working with AI tools over the past months, you've started to see that "
-            "the real potential is not efficiency — doing the same things faster — "
-            "but something more fundamental: "
-            "a genuinely different way of approaching problems, distributing thinking, "
-            "and organising how work gets done. "
-            "Realising that potential would require your team to change not just their tools "
-            "but their assumptions about their own roles, expertise, and what good work looks like. "
-            "That is a much harder conversation than 'here's a useful tool.' "
-            "And you're not sure your organisation — or you — is ready for it."
-        ),
-        "prompt": "The incremental path is safer. The transformative path is uncertain. What do you do?",
-        "options": [
-            ("Continue incremental adoption — change carries risk, and the efficiency gains from current use already justify the investment.", 1),
-            ("Share your emerging perspective with your team and gauge their appetite for a more fundamental rethink before committing to anything.", 2),
-            ("Design a structured experiment — scope a specific workflow for reimagining, define what success looks like beyond efficiency, and run a real pilot with a learning design built in.", 3),
-            ("Treat this as a moment that requires genuine co-creation — involve the team in examining their assumptions about work and expertise, not just in adopting a new tool, and build a shared learning architecture that can evolve as the technology and the team's understanding evolves together.", 4),
-        ],
-    },
-]
+class ClassAggregates:
+    SUM, SUMSQ = range(2)
+
+    def __init__(self):
+        self._dims  = list(DIMENSIONS.keys())
+        self._lock  = threading.Lock()
+        self._parts = {}   # class_code (None = everyone) -> [count, 2×dims sums, dims×21 histogram]
+        self._short = {}   # (class_code, bank digest) -> [submissions, scenarios skipped]
+
+    def _new_part(self):
+        return [0, np.zeros((2, len(self._dims))), np.zeros((len(self._dims), 21), dtype=np.int64)]
+
+    def _fold(self, class_code, changes):
+        """Apply (scores, sign, bank, skipped) changes under one lock acquisition."""
+        rows = np.arange(len(self._dims))
+        with self._lock:
+            for scores, sign, bank, skipped in changes:
+                v    = np.array([scores[k] for k in self._dims], dtype=float)
+                cols = np.clip(v.astype(int), 0, 20)
+                short = self._short.setdefault((class_code, bank), [0, 0])
+                short[0] += sign
+                short[1] += sign * skipped
+                for key in (None, class_code):
+                    part = self._parts.get(key)
+                    if part is None:
+                        part = self._parts[key] = self._new_part()
+                    part[0] += sign
+                    part[1][self.SUM]   += sign * v
+                    part[1][self.SUMSQ] += sign * v * v
+                    part[2][rows, cols] += sign
+
+    def add(self, class_code: str, scores: dict, bank=None, skipped: int = 0):
+        """Fold in one submission, answered on the bank with digest *bank* (None: the default bank)."""
+        self._fold(class_code, [(scores, 1, bank, skipped)])
+
+    def remove(self, class_code: str, scores: dict, bank=None, skipped: int = 0):
+        """Undo an earlier add() (a submission replaced under the latest-version policy)."""
+        self._fold(class_code, [(scores, -1, bank, skipped)])
+
+    def replace(self, class_code: str, old: dict, new: dict):
+        """remove() submission record *old* and add() *new* in one step, so a reader never
+        sees the cohort with neither."""
+        self._fold(class_code, [(old["scores"], -1, old.get("bank"), old.get("skipped", 0)),
+                                (new["scores"], 1, new.get("bank"), new.get("skipped", 0))])
+
+    def clear(self):
+        with self._lock:
+            self._parts.clear()
+            self._short.clear()
+
+    def summary(self, class_code=None) -> dict:
+        """count plus per-dimension mean / std / min / max for one class (None = all).
+
+        Scores are whole numbers 0–20, so min and max are read off the histogram,
+        which keeps them exact when a submission is removed.
+        """
+        with self._lock:
+            part = self._parts.get(class_code)
+            if part is None or part[0] == 0:
+                return {"count": 0}
+            n, a, hist = part[0], part[1].copy(), part[2] > 0
+        mean = a[self.SUM] / n
+        std  = np.sqrt(np.maximum(a[self.SUMSQ] / n - mean ** 2, 0.0))
+        lo   = hist.argmax(axis=1).astype(float)
+        hi   = (20 - hist[:, ::-1].argmax(axis=1)).astype(float)
+        out  = {"count": n}
+        for stat, arr in (("mean", mean), ("std", std), ("min", lo), ("max", hi)):
+            out[stat] = dict(zip(self._dims, arr.tolist()))
+        return out
+
+    def items_saved(self, class_code) -> tuple:
+        """(scenarios skipped by the adaptive short form, scenarios offered, submissions) for one class."""
+        with self._lock:
+            short = [(d, n, k) for (c, d), (n, k) in self._short.items() if c == class_code]
+        offered = sum(n * len((bank_by_digest(d) or DEFAULT_BANK).scenarios) for d, n, _ in short)
+        return sum(k for *_, k in short), offered, sum(n for _, n, _ in short)
+
+    def quantiles(self, class_code=None, qs=(0.10, 0.25, 0.50, 0.75, 0.90)) -> dict:
+        """{q: {dim: score}} read off the histogram (nearest rank); {} when empty."""
+        with self._lock:
+            part = self._parts.get(class_code)
+            if part is None or part[0] == 0:
+                return {}
+            n, cum = part[0], np.cumsum(part[2], axis=1)
+        out = {}
+        for q in qs:
+            rank   = max(int(np.ceil(q * n)), 1)
+            out[q] = dict(zip(self._dims, (cum >= rank).argmax(axis=1).tolist()))
+        return out
+
+# ─────────────────────────────────────────────────────────────────────────────
+# COHORT SUMMARIES
+# One summary row per class_code and dimension — count, sum, sum of squares
+# and a count per score tier — folded in with each submission (and out again
+# when a retake replaces one), plus when the cohort's first and last
+# submissions arrived. They hold nothing personal, so unlike the class list
+# they outlive Clear Stored Results and build up a history of cohorts for the
+# comparison view, which reads only these rows. The SQLite store keeps them
+# in its cohort_stats table.
+# ─────────────────────────────────────────────────────────────────────────────
+TIERS       = list(dict.fromkeys(score_tier(s)[:2] for s in range(MAX_SCORE + 1)))   # (name, colour)
+TIER_OF     = np.array([score_tier(s)[2] for s in range(MAX_SCORE + 1)])
+COHORT_COLS = ["n", "total", "total_sq"] + [name.lower() for name, _ in TIERS]
+
+def cohort_counts(scores: dict) -> np.ndarray:
+    """One submission as dims × COHORT_COLS: 1, score, score², then a 1 in its tier's column."""
+    v   = np.array([scores[k] for k in DIM_KEYS], dtype=np.int64)
+    out = np.zeros((len(DIM_KEYS), len(COHORT_COLS)), dtype=np.int64)
+    out[:, 0], out[:, 1], out[:, 2] = 1, v, v * v
+    out[np.arange(len(DIM_KEYS)), 3 + TIER_OF[np.clip(v, 0, MAX_SCORE)]] = 1
+    return out
+
+def cohort_summary(class_code, counts: np.ndarray, first_at: float, last_at: float) -> dict:
+    """Summary row from a cohort's accumulated cohort_counts(): count, mean, var and tier counts per dimension."""
+    n    = int(counts[0, 0])
+    mean = counts[:, 1] / n
+    var  = np.maximum(counts[:, 2] / n - mean ** 2, 0.0)
+    return {"class_code": class_code, "count": n, "first_at": first_at, "last_at": last_at,
+            "mean":  dict(zip(DIM_KEYS, mean.tolist())),
+            "var":   dict(zip(DIM_KEYS, var.tolist())),
+            "tiers": {k: dict(zip((t for t, _ in TIERS), row.tolist())) for k, row in zip(DIM_KEYS, counts[:, 3:])}}
+
+
+class CohortSummaries:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}   # class_code -> [counts, first_at, last_at]
+
+    def fold(self, class_code: str, scores: dict, at: float, sign: int = 1):
+        """Add a submission that arrived at *at*; sign=-1 takes a replaced one back out (times stay)."""
+        with self._lock:
+            row = self._rows.get(class_code)
+            if row is None:
+                row = self._rows[class_code] = [np.zeros((len(DIM_KEYS), len(COHORT_COLS)), dtype=np.int64), at, at]
+            row[0] += sign * cohort_counts(scores)
+            if sign > 0:
+                row[1], row[2] = min(row[1], at), max(row[2], at)
+
+    def forget(self, class_code: str):
+        with self._lock:
+            self._rows.pop(class_code, None)
+
+    def items(self) -> list:
+        """(class_code, counts, first_at, last_at) for every cohort with submissions."""
+        with self._lock:
+            return [(c, r[0].copy(), r[1], r[2]) for c, r in self._rows.items() if r[0][0, 0] > 0]
+
+    def summaries(self) -> list:
+        """cohort_summary() rows, oldest cohort first."""
+        return sorted((cohort_summary(*item) for item in self.items()), key=lambda r: r["first_at"])
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CLASS STORE
+# Submissions sit behind a small backend interface (append / rows / clear).
+# "memory" (default) is a per-process list that resets on restart;
+# "sqlite" is an embedded WAL-mode database shared by every process on the
+# host. Choose with CLASS_STORE / CLASS_STORE_PATH in Streamlit secrets.
+# ─────────────────────────────────────────────────────────────────────────────
+ITEM_LOG_MIN_GROUP = 5   # consenting respondents a class code needs to stay on archived item rows
+
+def archive_items(rows) -> list:
+    """(class_code, items, bank) of consenting submissions being cleared, ready for the item log:
+    class codes with fewer than ITEM_LOG_MIN_GROUP rows for a bank are pooled under '', and the
+    order is shuffled so it says nothing about who submitted when."""
+    sizes = Counter((c, b) for c, _, b in rows)
+    out   = [(c if sizes[c, b] >= ITEM_LOG_MIN_GROUP else "", bytes(items), b) for c, items, b in rows]
+    secrets.SystemRandom().shuffle(out)
+    return out
+
+
+def participant_key(name: str) -> str:
+    """Who a submission belongs to within a cohort under the opt-in latest-version policy.
+
+    Only the name is known, so two participants with the same name in one
+    cohort count as one person; that is why the policy is opt-in.
+    """
+    return " ".join(name.split()).casefold()
+
+
+class MemoryStore:
+    def __init__(self, policy: str = "all"):
+        self.policy = policy
+        self._parts = {}   # class_code -> list of submissions
+        self._seqs  = {}   # class_code -> store version at which each submission landed
+        self._keys  = set()   # idempotency keys already stored
+        self._who   = {}   # (class_code, participant_key) -> seq of their current submission
+        self._items = {}   # (class_code, bank digest) -> packed answers archived by clear() (see archive_items)
+        self._lock  = threading.Lock()
+        self._version = self._cleared = 0
+        self._rewritten = {}   # class_code -> version of its last replaced submission
+        self.stats  = ClassAggregates()
+        self._cohorts = CohortSummaries()   # kept by clear()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def rewritten_at(self, class_code=None) -> int:
+        """Version of the last change that removed rows from *class_code* (None = any):
+        a clear, or a submission replaced under the latest-version policy."""
+        with self._lock:
+            if class_code is None:
+                return max(self._cleared, *self._rewritten.values(), 0)
+            return max(self._cleared, self._rewritten.get(class_code, 0))
+
+    def append(self, rec: dict) -> str:
+        return self.append_many([rec])[0]
+
+    def append_many(self, recs: list) -> list:
+        """Store *recs*; each gets 'stored', 'replaced' (latest-version policy) or 'duplicate' (key seen)."""
+        out = []
+        for rec in recs:
+            code, key = rec.get("class_code", ""), rec.get("key")
+            who = (code, participant_key(rec["name"]))
+            old = None
+            with self._lock:
+                if key and key in self._keys:
+                    out.append("duplicate")
+                    continue
+                self._version += 1
+                if self.policy == "latest" and who in self._who:
+                    seqs = self._seqs[code]
+                    i    = bisect.bisect_left(seqs, self._who[who])
+                    old  = self._parts[code].pop(i)
+                    del seqs[i]
+                    self._rewritten[code] = self._version
+                self._parts.setdefault(code, []).append(rec)
+                self._seqs.setdefault(code, []).append(self._version)
+                self._who[who] = self._version
+                if key:
+                    self._keys.add(key)
+                # Folded under the store lock, so a cohort listed by class_codes() is already counted.
+                if old is not None:
+                    self.stats.replace(code, old, rec)
+                    self._cohorts.fold(code, old["scores"], 0.0, -1)
+                else:
+                    self.stats.add(code, rec["scores"], rec.get("bank"), rec.get("skipped", 0))
+                self._cohorts.fold(code, rec["scores"], time.time())
+            out.append("stored" if old is None else "replaced")
+        return out
+
+    def rows_since(self, version: int, class_code=None, until=None) -> list:
+        """Submissions that landed after *version* (and no later than *until*), oldest first."""
+        with self._lock:
+            codes = self._parts if class_code is None else [class_code]
+            new = []
+            for c in codes:
+                seqs = self._seqs.get(c, [])
+                i = bisect.bisect_right(seqs, version)
+                j = len(seqs) if until is None else bisect.bisect_right(seqs, until)
+                new += zip(seqs[i:j], self._parts[c][i:j])
+        return [r for _, r in sorted(new, key=lambda sr: sr[0])]
+
+    def rows(self, class_code=None) -> list:
+        with self._lock:
+            if class_code is None:
+                return [r for part in self._parts.values() for r in part]
+            return list(self._parts.get(class_code, ()))
+
+    def iter_chunks(self, class_code=None, size: int = 5000):
+        """rows() in lists of at most *size*, for exports."""
+        rows = self.rows(class_code)
+        for i in range(0, len(rows), size):
+            yield rows[i:i + size]
+
+    def class_codes(self) -> list:
+        with self._lock:
+            return sorted(self._parts)
+
+    def items_saved(self, class_code) -> tuple:
+        """(scenarios skipped by the adaptive short form, scenarios offered, submissions) for *class_code*."""
+        return self.stats.items_saved(class_code)
+
+    def responses(self, bank: Bank, class_code=None) -> np.ndarray:
+        """Item-level log for *bank*: (respondents, scenarios) int8 in bank order. Current
+        submissions carry their own items (so a retake replaces them); cleared ones are archived."""
+        with self._lock:
+            buf = b"".join(v for (c, d), v in self._items.items()
+                           if d == bank.digest and class_code in (None, c))
+            buf += b"".join(r["items"] for c, part in self._parts.items() if class_code in (None, c)
+                            for r in part if r.get("items") and r["bank"] == bank.digest)
+        return np.frombuffer(buf, dtype=np.int8).reshape(-1, len(bank.scenarios))
+
+    def cohort_summaries(self) -> list:
+        """Summary row per class_code ever seen, oldest cohort first (see COHORT SUMMARIES)."""
+        return self._cohorts.summaries()
+
+    def forget_cohort(self, class_code: str) -> bool:
+        """Drop *class_code*'s summary row; refused (False) while it still has stored submissions."""
+        with self._lock:
+            if self._parts.get(class_code):
+                return False
+            self._cohorts.forget(class_code)
+        return True
+
+    def clear(self):
+        with self._lock:
+            for code, items, digest in archive_items([(c, r["items"], r["bank"]) for c, part in self._parts.items()
+                                                      for r in part if r.get("items")]):
+                self._items.setdefault((code, digest), bytearray()).extend(items)
+            self._parts.clear()
+            self._seqs.clear()
+            self._keys.clear()
+            self._who.clear()
+            self._rewritten.clear()
+            self._version += 1
+            self._cleared = self._version
+            self.stats.clear()
+
+    def __len__(self):
+        return sum(len(part) for part in self._parts.values())
+
+    def __iter__(self):
+        return iter(self.rows())
+
+
+class SQLiteStore:
+    def __init__(self, path: str, policy: str = "all"):
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._dims = list(DIMENSIONS.keys())
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        dim_cols = ", ".join(f"{k} INTEGER NOT NULL" for k in self._dims)
+        with self._db:
+            # Schema setup and migrations hold the write lock throughout, so processes starting
+            # together run them one at a time (and only one of them backfills cohort_stats).
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(f"""
+                CREATE TABLE IF NOT EXISTS submissions (
+                    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL    NOT NULL,
+                    timestamp  TEXT    NOT NULL,
+                    name       TEXT    NOT NULL,
+                    class_code TEXT    NOT NULL DEFAULT '',
+                    {dim_cols}
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_submissions_class "
+                             "ON submissions (class_code, created_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_submissions_created "
+                             "ON submissions (created_at)")
+            have = {r[1] for r in self._db.execute("PRAGMA table_info(submissions)")}
+            if "idem_key" not in have:      # databases created before idempotent submits
+                self._db.execute("ALTER TABLE submissions ADD COLUMN idem_key TEXT")
+            if "participant" not in have:
+                self._db.execute("ALTER TABLE submissions ADD COLUMN participant TEXT")
+                self._db.executemany("UPDATE submissions SET participant = ? WHERE id = ?",
+                                     [(participant_key(n), i) for i, n in
+                                      self._db.execute("SELECT id, name FROM submissions").fetchall()])
+            if "skipped" not in have:       # scenarios skipped by the adaptive short form
+                self._db.execute("ALTER TABLE submissions ADD COLUMN skipped INTEGER NOT NULL DEFAULT 0")
+            if "items" not in have:         # a consenting respondent's answers, in the order of bank's scenarios
+                self._db.execute("ALTER TABLE submissions ADD COLUMN items BLOB")
+                self._db.execute("ALTER TABLE submissions ADD COLUMN bank TEXT")   # digest of the bank answered
+            self._db.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_submissions_key "
+                             "ON submissions (idem_key)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_submissions_participant "
+                             "ON submissions (class_code, participant)")
+            # Submissions removed by a retake under the latest-version policy, so every process
+            # can take their scores back out of its aggregates; clear() empties it.
+            self._db.execute(f"""
+                CREATE TABLE IF NOT EXISTS replaced (
+                    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sub_id     INTEGER NOT NULL,
+                    class_code TEXT    NOT NULL,
+                    at_version INTEGER NOT NULL,
+                    bank       TEXT,
+                    skipped    INTEGER NOT NULL DEFAULT 0,
+                    {dim_cols}
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_replaced_class ON replaced (class_code, at_version)")
+            # Item-level log archive. Consenting respondents' items stay on their submission row
+            # until clear() moves them here through archive_items(): no name, key or time, small
+            # class codes pooled, shuffled. items is laid out in the order of the scenario bank
+            # whose digest is in bank.
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    id         INTEGER PRIMARY KEY,
+                    class_code TEXT NOT NULL DEFAULT '',
+                    items      BLOB NOT NULL,
+                    bank       TEXT
+                )""")
+            if "bank" not in {r[1] for r in self._db.execute("PRAGMA table_info(responses)")}:
+                # Logged before banks were versioned, against what is now the oldest bank file.
+                oldest = (scan_banks(BANK_DIR)[0] or [DEFAULT_BANK])[0]
+                self._db.execute("ALTER TABLE responses ADD COLUMN bank TEXT")
+                self._db.execute("UPDATE responses SET bank = ?", (oldest.digest,))
+            if "items" not in have:   # logged at submit time, in submission order: reorder and pool them
+                logged = self._db.execute("SELECT class_code, items, bank FROM responses").fetchall()
+                self._db.execute("DELETE FROM responses")
+                self._db.executemany("INSERT INTO responses (class_code, items, bank) VALUES (?, ?, ?)",
+                                     archive_items(logged))
+            self._db.execute("DROP INDEX IF EXISTS ix_responses_class")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_responses_bank ON responses (bank, class_code)")
+            # Cohort summary rows (see COHORT SUMMARIES); clear() leaves them in place.
+            fresh = not self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'cohort_stats'").fetchone()
+            self._db.execute(f"""
+                CREATE TABLE IF NOT EXISTS cohort_stats (
+                    class_code TEXT NOT NULL,
+                    dim        TEXT NOT NULL,
+                    {", ".join(f"{c} INTEGER NOT NULL" for c in COHORT_COLS)},
+                    first_at   REAL NOT NULL,
+                    last_at    REAL NOT NULL,
+                    PRIMARY KEY (class_code, dim)
+                )""")
+            if fresh:   # databases created before cohort summaries: fold in what is there
+                past = CohortSummaries()
+                for code, at, *vals in self._db.execute(
+                        f"SELECT class_code, created_at, {', '.join(self._dims)} FROM submissions"):
+                    past.fold(code, dict(zip(self._dims, vals)), at)
+                for code, counts, first_at, last_at in past.items():
+                    self._db.executemany(self._cohort_upsert, self._cohort_params(code, counts, first_at, last_at))
+        self._stats     = ClassAggregates()
+        self._synced    = 0   # highest submissions.id folded into _stats
+        self._unfolded  = 0   # highest replaced.id taken back out of _stats
+        self._rewritten = 0   # user_version (version of the last clear) _stats has seen
+
+    _cohort_upsert = (
+        f"INSERT INTO cohort_stats (class_code, dim, {', '.join(COHORT_COLS)}, first_at, last_at) "
+        f"VALUES ({', '.join('?' * (len(COHORT_COLS) + 4))}) "
+        f"ON CONFLICT (class_code, dim) DO UPDATE SET "
+        + ", ".join(f"{c} = {c} + excluded.{c}" for c in COHORT_COLS)
+        + ", first_at = MIN(first_at, excluded.first_at), last_at = MAX(last_at, excluded.last_at)")
+
+    @staticmethod
+    def _cohort_params(code, counts, first_at, last_at) -> list:
+        return [(code, k, *row, first_at, last_at) for k, row in zip(DIM_KEYS, counts.tolist())]
+
+    @property
+    def stats(self) -> ClassAggregates:
+        """Aggregates, first folding in rows written and replaced since the last look (incl. other
+        processes). Both are read from one snapshot; only a clear() makes it start over."""
+        dims = ", ".join(self._dims)
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            rewritten = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if rewritten > self._rewritten:   # cleared since we last looked, maybe by another process
+                self._stats.clear()
+                self._rewritten, self._synced = rewritten, 0
+                self._unfolded = self._db.execute("SELECT COALESCE(MAX(id), 0) FROM replaced").fetchone()[0]
+            gone = self._db.execute(f"SELECT id, sub_id, class_code, bank, skipped, {dims} FROM replaced "
+                                    f"WHERE id > ? ORDER BY id", (self._unfolded,)).fetchall()
+            for rid, sub_id, code, bank, skipped, *vals in gone:
+                if sub_id <= self._synced:   # else it went before we ever folded it in
+                    self._stats.remove(code, dict(zip(self._dims, vals)), bank, skipped)
+                self._unfolded = rid
+            new = self._db.execute(f"SELECT id, class_code, bank, skipped, {dims} FROM submissions "
+                                   f"WHERE id > ? ORDER BY id", (self._synced,)).fetchall()
+            for rid, code, bank, skipped, *vals in new:
+                self._stats.add(code, dict(zip(self._dims, vals)), bank, skipped)
+                self._synced = rid
+        return self._stats
+
+    @property
+    def version(self) -> int:
+        """The AUTOINCREMENT high-water mark: rises with every insert (from any process) and on clear()."""
+        with self._lock:
+            row = self._db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'submissions'").fetchone()
+        return row[0] if row else 0
+
+    def rewritten_at(self, class_code=None) -> int:
+        """Version of the last change that removed rows from *class_code* (None = any):
+        a clear, or a submission replaced under the latest-version policy."""
+        sql, args = "SELECT COALESCE(MAX(at_version), 0) FROM replaced", ()
+        if class_code is not None:
+            sql, args = sql + " WHERE class_code = ?", (class_code,)
+        with self._lock:
+            cleared = self._db.execute("PRAGMA user_version").fetchone()[0]
+            return max(cleared, self._db.execute(sql, args).fetchone()[0])
+
+    def rows_since(self, version: int, class_code=None, until=None) -> list:
+        # Ids are handed out from the same sequence as version, so new rows are id > version;
+        # the unary + keeps SQLite on the primary-key range instead of the class index.
+        sql  = f"SELECT name, class_code, timestamp, {', '.join(self._dims)} FROM submissions WHERE id > ?"
+        args = (version,)
+        if until is not None:
+            sql += " AND id <= ?"
+            args += (until,)
+        if class_code is not None:
+            sql += " AND +class_code = ?"
+            args += (class_code,)
+        with self._lock:
+            cur = self._db.execute(sql + " ORDER BY id", args).fetchall()
+        return [{"name": n, "class_code": c, "timestamp": t,
+                 "scores": dict(zip(self._dims, s))} for n, c, t, *s in cur]
+
+    def append(self, rec: dict) -> str:
+        return self.append_many([rec])[0]
+
+    def append_many(self, recs: list) -> list:
+        """Store *recs* in one transaction; each gets 'stored', 'replaced' or 'duplicate'.
+
+        The unique index on idem_key makes a repeated key a no-op even when the
+        first copy came through another process.
+        """
+        cols   = ["created_at", "timestamp", "name", "class_code", "idem_key", "participant", "skipped",
+                  "items", "bank"] + self._dims
+        insert = (f"INSERT OR IGNORE INTO submissions ({', '.join(cols)}) "
+                  f"VALUES ({', '.join('?' * len(cols))})")
+        out = []
+        with self._lock, self._db:
+            for rec in recs:
+                code, who = rec.get("class_code", ""), participant_key(rec["name"])
+                if rec.get("key") and self._db.execute("SELECT 1 FROM submissions WHERE idem_key = ?",
+                                                       (rec["key"],)).fetchone():
+                    out.append("duplicate")
+                    continue
+                gone = []
+                if self.policy == "latest":
+                    gone = self._db.execute(f"DELETE FROM submissions WHERE class_code = ? AND participant = ? "
+                                            f"RETURNING id, created_at, bank, skipped, {', '.join(self._dims)}",
+                                            (code, who)).fetchall()
+                for _, at, _, _, *old in gone:
+                    counts = -cohort_counts(dict(zip(self._dims, old)))
+                    self._db.executemany(self._cohort_upsert, self._cohort_params(code, counts, at, at))
+                items = bytes(rec["items"]) if rec.get("items") else None
+                vals  = [time.time(), rec["timestamp"], rec["name"], code, rec.get("key"), who,
+                         rec.get("skipped", 0), items, rec.get("bank")]
+                new_id = self._db.execute(insert, vals + [rec["scores"][k] for k in self._dims]).lastrowid
+                if gone:
+                    self._db.executemany(f"INSERT INTO replaced (sub_id, class_code, at_version, bank, skipped, "
+                                         f"{', '.join(self._dims)}) VALUES ({', '.join('?' * (5 + len(self._dims)))})",
+                                         [(sub_id, code, new_id, *old) for sub_id, _, *old in gone])
+                self._db.executemany(self._cohort_upsert,
+                                     self._cohort_params(code, cohort_counts(rec["scores"]), vals[0], vals[0]))
+                out.append("replaced" if gone else "stored")
+        return out
+
+    def rows(self, class_code=None) -> list:
+        sql = f"SELECT name, class_code, timestamp, {', '.join(self._dims)} FROM submissions"
+        args = ()
+        if class_code is not None:
+            sql += " WHERE class_code = ?"
+            args = (class_code,)
+        sql += " ORDER BY created_at, id"
+        with self._lock:
+            cur = self._db.execute(sql, args).fetchall()
+        return [{"name": n, "class_code": c, "timestamp": t,
+                 "scores": dict(zip(self._dims, s))} for n, c, t, *s in cur]
+
+    def iter_chunks(self, class_code=None, size: int = 5000):
+        """rows() in lists of at most *size*. Pages are keyed on (created_at, id), which the
+        indexes already order, so only one page is in memory and the lock is released between pages."""
+        sql = (f"SELECT created_at, id, name, class_code, timestamp, {', '.join(self._dims)} "
+               f"FROM submissions WHERE (created_at, id) > (?, ?)")
+        if class_code is not None:
+            sql += " AND class_code = ?"
+        sql += " ORDER BY created_at, id LIMIT ?"
+        key = (-1.0, 0)
+        while True:
+            args = key + ((class_code,) if class_code is not None else ()) + (size,)
+            with self._lock:
+                page = self._db.execute(sql, args).fetchall()
+            if not page:
+                return
+            key = page[-1][:2]
+            yield [{"name": n, "class_code": c, "timestamp": t,
+                    "scores": dict(zip(self._dims, s))} for _, _, n, c, t, *s in page]
+
+    def class_codes(self) -> list:
+        with self._lock:
+            cur = self._db.execute("SELECT DISTINCT class_code FROM submissions ORDER BY class_code")
+            return [c for (c,) in cur]
+
+    def items_saved(self, class_code) -> tuple:
+        """(scenarios skipped by the adaptive short form, scenarios offered, submissions) for *class_code*."""
+        return self.stats.items_saved(class_code)
+
+    def responses(self, bank: Bank, class_code=None) -> np.ndarray:
+        """Item-level log for *bank*: (respondents, scenarios) int8 in bank order. Current
+        submissions carry their own items (so a retake replaces them); cleared ones are archived."""
+        where, args = "bank = ?", (bank.digest,)
+        if class_code is not None:
+            where, args = where + " AND class_code = ?", args + (class_code,)
+        sql = (f"SELECT items FROM responses WHERE {where} "
+               f"UNION ALL SELECT items FROM submissions WHERE {where} AND items IS NOT NULL")
+        args *= 2
+        with self._lock:
+            buf = b"".join(r[0] for r in self._db.execute(sql, args))
+        return np.frombuffer(buf, dtype=np.int8).reshape(-1, len(bank.scenarios))
+
+    def cohort_summaries(self) -> list:
+        """Summary row per class_code ever seen, oldest cohort first (see COHORT SUMMARIES)."""
+        with self._lock:
+            cur = self._db.execute(f"SELECT class_code, dim, {', '.join(COHORT_COLS)}, first_at, last_at "
+                                   f"FROM cohort_stats WHERE n > 0").fetchall()
+        parts = {}
+        for code, dim, *vals in cur:
+            part = parts.setdefault(code, [np.zeros((len(DIM_KEYS), len(COHORT_COLS)), dtype=np.int64),
+                                           vals[-2], vals[-1]])
+            part[0][DIM_KEYS.index(dim)] = vals[:-2]
+        return sorted((cohort_summary(c, *p) for c, p in parts.items()), key=lambda r: r["first_at"])
+
+    def forget_cohort(self, class_code: str) -> bool:
+        """Drop *class_code*'s summary row; refused (False) while it still has stored submissions."""
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            if self._db.execute("SELECT 1 FROM submissions WHERE class_code = ? LIMIT 1", (class_code,)).fetchone():
+                return False
+            self._db.execute("DELETE FROM cohort_stats WHERE class_code = ?", (class_code,))
+        return True
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.executemany("INSERT INTO responses (class_code, items, bank) VALUES (?, ?, ?)",
+                                 archive_items(self._db.execute("SELECT class_code, items, bank FROM submissions "
+                                                                "WHERE items IS NOT NULL").fetchall()))
+            self._db.execute("DELETE FROM submissions")
+            self._db.execute("DELETE FROM replaced")
+            # Bump the sequence so version moves, and record it as the latest rewrite.
+            if not self._db.execute("UPDATE sqlite_sequence SET seq = seq + 1 "
+                                    "WHERE name = 'submissions'").rowcount:
+                self._db.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('submissions', 1)")
+            seq = self._db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'submissions'").fetchone()[0]
+            self._db.execute(f"PRAGMA user_version = {int(seq)}")
+            self._stats.clear()
+            self._synced = self._rewritten = seq
+            self._unfolded = 0   # replaced ids keep rising (AUTOINCREMENT), so every later one is new
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM submissions").fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.rows())
+
+
+@st.cache_resource
+def get_class_store():
+    policy = _secret("SUBMISSION_POLICY", "all")
+    if _secret("CLASS_STORE", "memory") == "sqlite":
+        return SQLiteStore(_secret("CLASS_STORE_PATH", "class_store.db"), policy)
+    return MemoryStore(policy)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# GOOGLE SHEETS DELIVERY
+# Rows go onto a bounded queue drained by one background worker, which posts
+# them over a shared keep-alive session — one row per post, the JSON object
+# the Apps Script snippet has always taken, retried with exponential
+# backoff — so the Submit click never waits on Google.
+# ─────────────────────────────────────────────────────────────────────────────
+class SheetsDelivery:
+    RETRIES   = 5
+    BACKOFF   = 1.0      # seconds before the first retry; doubles each attempt
+    KEEP      = 50_000   # ticket statuses remembered for confirmation polling
+
+    def __init__(self, maxsize: int = 1000):
+        self._q       = queue.Queue(maxsize=maxsize)
+        self._lock    = threading.Lock()
+        self._status  = OrderedDict()   # ticket -> queued / delivered / failed
+        self._ids     = itertools.count(1)
+        import requests
+        self._session = requests.Session()
+        threading.Thread(target=self._run, name="sheets-delivery", daemon=True).start()
+
+    def submit(self, url: str, row: dict) -> int:
+        ticket = next(self._ids)
+        self._set(ticket, "queued")
+        try:
+            self._q.put_nowait((ticket, url, row))
+        except queue.Full:
+            self._set(ticket, "failed")
+        return ticket
+
+    def _set(self, ticket, state):
+        with self._lock:
+            self._status[ticket] = state
+            while len(self._status) > self.KEEP:
+                self._status.popitem(last=False)
+
+    def status(self, ticket) -> str:
+        """'queued', 'delivered', 'failed', 'disabled' (no ticket) or 'expired' (too old to remember)."""
+        if ticket is None:
+            return "disabled"
+        return self._status.get(ticket, "expired")
+
+    def _run(self):
+        while True:
+            ticket, url, row = self._q.get()
+            self._set(ticket, "delivered" if self._deliver(url, row) else "failed")
+
+    @timed("sheets_post")
+    def _deliver(self, url, row) -> bool:
+        for attempt in range(self.RETRIES):
+            try:
+                if self._session.post(url, json=row, timeout=8).status_code == 200:
+                    return True
+            except Exception:
+                pass
+            if attempt < self.RETRIES - 1:
+                time.sleep(self.BACKOFF * 2 ** attempt)
+        return False
+
+
+@st.cache_resource
+def get_sheets_delivery():
+    return SheetsDelivery()
+
+def submit_to_sheets(row: dict):
+    """Queue *row* for the research sheet; returns a ticket for get_sheets_delivery().status()."""
+    url = _secret("GOOGLE_SHEET_URL", "")
+    if not url:
+        return None
+    return get_sheets_delivery().submit(url, row)
 
 # ─────────────────────────────────────────────────────────────────────────────
-# SCORING
+# SUBMISSION INGEST
+# Submit only enqueues: a worker drains whatever has piled up into the class
+# store in one batch, then hands the stored rows to Sheets. Each submission
+# carries an idempotency key (one per attempt), so a double-click or a resumed
+# session resubmitting is a no-op; when the queue is full the participant is
+# asked to try again rather than the server doing the work inline.
 # ─────────────────────────────────────────────────────────────────────────────
-def compute_scores(answers: dict) -> dict:
-    totals = {k: 0 for k in DIMENSIONS}
-    for sc in SCENARIOS:
-        val = answers.get(sc["id"])
-        if val is not None:
-            totals[sc["dim"]] += val
-    return totals
-
-def score_tier(s: float, max_s: float = 20):
-    pct = s / max_s
-    if pct < 0.40: return "Emerging",   "#F97316", 0
-    if pct < 0.60: return "Developing", "#3B82F6", 1
-    if pct < 0.80: return "Proficient", "#10B981", 2
-    return              "Advanced",   "#8B5CF6", 3
+class SubmissionIngest:
+    BATCH_MAX = 200
+    KEEP      = 50_000   # statuses remembered for confirmation polling
+
+    def __init__(self, store, sheets, maxsize: int = 2000):
+        self._store   = store
+        self._sheets  = sheets
+        self._q       = queue.Queue(maxsize=maxsize)
+        self._lock    = threading.Lock()
+        self._status  = OrderedDict()   # key -> queued / stored / replaced / duplicate / failed
+        self._tickets = {}              # key -> Sheets ticket
+        threading.Thread(target=self._run, name="submission-ingest", daemon=True).start()
+
+    def submit(self, key: str, rec: dict, row: dict, sheets_url: str = "") -> str:
+        """Queue *rec* under *key*; returns its status, or 'busy' when the queue is full."""
+        with self._lock:
+            if self._status.get(key, "failed") != "failed":   # a failed batch may be retried
+                return self._status[key]
+            self._status[key] = "queued"
+            while len(self._status) > self.KEEP:
+                self._tickets.pop(self._status.popitem(last=False)[0], None)
+        try:
+            self._q.put_nowait((key, dict(rec, key=key), row, sheets_url))
+        except queue.Full:
+            with self._lock:
+                del self._status[key]
+            return "busy"
+        return "queued"
+
+    def status(self, key) -> str:
+        # Unknown keys were stored by an earlier process (the session was resumed).
+        return self._status.get(key, "stored")
+
+    def sheets_ticket(self, key):
+        return self._tickets.get(key)
+
+    def _run(self):
+        while True:
+            batch = [self._q.get()]
+            while len(batch) < self.BATCH_MAX:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                results = self._store.append_many([rec for _, rec, _, _ in batch])
+            except Exception:
+                results = ["failed"] * len(batch)
+            for (key, _, row, url), result in zip(batch, results):
+                if url and result in ("stored", "replaced"):
+                    self._tickets[key] = self._sheets.submit(url, row)
+                self._status[key] = result
+
+
+@st.cache_resource
+def get_submission_ingest():
+    return SubmissionIngest(get_class_store(), get_sheets_delivery(),
+                            int(_secret("INGEST_QUEUE_SIZE", 2000)))
 
 # ─────────────────────────────────────────────────────────────────────────────
 # CHARTS
+# Plotly looks pandas up in sys.modules when it validates trace data, so a
+# figure built while another thread is still importing pandas sees a
+# half-initialised module and raises. Charts therefore import pandas first,
+# which waits for an import in flight; no chart is on the welcome page.
 # ─────────────────────────────────────────────────────────────────────────────
-def make_radar(all_scores, labels, title="Boundary Crossing Profile"):
-    keys   = list(DIMENSIONS.keys())
-    names  = [DIMENSIONS[k]["name"] for k in keys]
-    pal    = ["#2563EB","#F59E0B","#10B981","#8B5CF6","#EF4444"]
-    fig    = go.Figure()
-    for i, scores in enumerate(all_scores):
-        vals  = [scores[k] for k in keys] + [scores[keys[0]]]
-        theta = names + [names[0]]
-        c     = pal[i % len(pal)]
-        r,g,b = int(c[1:3],16), int(c[3:5],16), int(c[5:7],16)
-        fig.add_trace(go.Scatterpolar(
-            r=vals, theta=theta, fill="toself",
-            fillcolor=f"rgba({r},{g},{b},0.12)",
-            line=dict(color=c, width=2.5), name=labels[i],
-        ))
+def _plotly():
+    importlib.import_module("pandas")
+    import plotly.graph_objects as go
+    return go
+
+def _radar_layout(fig, title, showlegend):
     fig.update_layout(
         polar=dict(
             bgcolor="rgba(248,250,252,0.9)",
@@ -569,18 +1075,65 @@ def make_radar(all_scores, labels, title="Boundary Crossing Profile"):
             angularaxis=dict(gridcolor="rgba(148,163,184,0.2)",
                              tickfont=dict(size=12,color="#334155")),
         ),
-        showlegend=len(all_scores)>1, legend=dict(font=dict(size=11)),
+        showlegend=showlegend, legend=dict(font=dict(size=11)),
         title=dict(text=title, font=dict(size=14,color="#1E293B",family="Georgia,serif"), x=0.5),
         paper_bgcolor="white", plot_bgcolor="white",
         height=400, margin=dict(t=65,b=10,l=20,r=20),
     )
     return fig
 
-def make_bar(scores):
-    keys   = list(DIMENSIONS.keys())
-    colors = [DIMENSIONS[k]["color"] for k in keys]
-    names  = [f"{DIMENSIONS[k]['icon']} {DIMENSIONS[k]['name']}" for k in keys]
+@timed("make_radar")
+def make_radar(all_scores, labels, title="Boundary Crossing Profile", dims=None):
+    dims   = dims or DIMENSIONS
+    keys   = list(dims.keys())
+    names  = [dims[k]["name"] for k in keys]
+    pal    = ["#2563EB","#F59E0B","#10B981","#8B5CF6","#EF4444"]
+    go = _plotly()
+    fig    = go.Figure()
+    for i, scores in enumerate(all_scores):
+        vals  = [scores[k] for k in keys] + [scores[keys[0]]]
+        theta = names + [names[0]]
+        c     = pal[i % len(pal)]
+        r,g,b = int(c[1:3],16), int(c[3:5],16), int(c[5:7],16)
+        fig.add_trace(go.Scatterpolar(
+            r=vals, theta=theta, fill="toself",
+            fillcolor=f"rgba({r},{g},{b},0.12)",
+            line=dict(color=c, width=2.5), name=labels[i],
+        ))
+    return _radar_layout(fig, title, showlegend=len(all_scores)>1)
+
+@timed("make_radar_bands")
+def make_radar_bands(quantiles, title="All Participants"):
+    """Median line with interquartile and 10th–90th percentile envelopes.
+
+    Draws five fixed-size traces whatever the class size; *quantiles* comes
+    from ClassAggregates.quantiles().
+    """
+    keys  = list(DIMENSIONS.keys())
+    names = [DIMENSIONS[k]["name"] for k in keys]
+    theta = names + [names[0]]
+    ring  = lambda q: [quantiles[q][k] for k in keys] + [quantiles[q][keys[0]]]
+    go = _plotly()
+    fig   = go.Figure()
+    for lo, hi, alpha, label in ((0.10, 0.90, 0.12, "10th–90th percentile"),
+                                 (0.25, 0.75, 0.28, "Middle 50%")):
+        fig.add_trace(go.Scatterpolar(r=ring(lo), theta=theta, mode="lines",
+                                      line=dict(width=0), showlegend=False, hoverinfo="skip"))
+        fig.add_trace(go.Scatterpolar(r=ring(hi), theta=theta, mode="lines", fill="tonext",
+                                      fillcolor=f"rgba(37,99,235,{alpha})",
+                                      line=dict(width=0), name=label))
+    fig.add_trace(go.Scatterpolar(r=ring(0.50), theta=theta, mode="lines+markers",
+                                  line=dict(color="#1E3A8A", width=2.5), name="Median"))
+    return _radar_layout(fig, title, showlegend=True)
+
+@timed("make_bar")
+def make_bar(scores, dims=None):
+    dims   = dims or DIMENSIONS
+    keys   = list(dims.keys())
+    colors = [dims[k]["color"] for k in keys]
+    names  = [f"{dims[k]['icon']} {dims[k]['name']}" for k in keys]
     vals   = [scores[k] for k in keys]
+    go = _plotly()
     fig = go.Figure(go.Bar(
         x=vals, y=names, orientation="h",
         marker=dict(color=colors, line=dict(width=0)),
@@ -597,169 +1150,359 @@ def make_bar(scores):
     )
     return fig
 
+@timed("make_cohort_trend")
+def make_cohort_trend(summaries, dims=None):
+    """Each dimension's cohort mean plotted at the date the cohort first submitted."""
+    dims  = dims or DIMENSIONS
+    when  = [datetime.fromtimestamp(r["first_at"]) for r in summaries]
+    codes = [f"{r['class_code'] or '(no class code)'} · n={r['count']}" for r in summaries]
+    go = _plotly()
+    fig = go.Figure()
+    for k, d in dims.items():
+        fig.add_trace(go.Scatter(
+            x=when, y=[r["mean"][k] for r in summaries], text=codes, name=d["name"],
+            mode="lines+markers", line=dict(color=d["color"], width=2.5), marker=dict(size=8),
+            hovertemplate="%{text}<br>%{y:.1f}/20<extra>" + d["name"] + "</extra>",
+        ))
+    fig.update_layout(
+        height=400,
+        title=dict(text="Cohort Trends", font=dict(size=14,color="#1E293B",family="Georgia,serif"), x=0.5),
+        xaxis=dict(showgrid=False, tickfont=dict(color="#94A3B8",size=10)),
+        yaxis=dict(range=[0,MAX_SCORE], showgrid=True, gridcolor="#E2E8F0",
+                   tickfont=dict(color="#94A3B8",size=10), zeroline=False),
+        legend=dict(orientation="h", font=dict(size=11)),
+        paper_bgcolor="white", plot_bgcolor="white", margin=dict(t=65,b=10,l=20,r=20),
+    )
+    return fig
+
 # ─────────────────────────────────────────────────────────────────────────────
-# HTML REPORT
+# FIGURE CACHE
+# A participant's charts depend only on their four dimension scores (and the
+# dimension names and colours of their scenario bank), and each score is a
+# sum of five 1–4 answers, so there are at most 16⁴ distinct profiles per
+# bank. Built figures are kept in a bounded LRU shared by every session,
+# keyed by (chart kind, bank digest, score tuple). Figures rather than JSON specs are
+# stored because st.plotly_chart re-validates dict specs, which costs about
+# as much as building the figure again.
 # ─────────────────────────────────────────────────────────────────────────────
-def html_report(name, scores, class_code=""):
-    now  = datetime.now().strftime("%d %B %Y")
-    meta = name
-    if class_code: meta += f" · {class_code}"
-    meta += f" · {now}"
-    rows = ""
-    for key, dim in DIMENSIONS.items():
-        s              = scores[key]
-        label, lc, ti  = score_tier(s)
-        pct            = (s/20)*100
-        rows += f"""
-        <div style="background:white;border-radius:12px;padding:1.2rem 1.5rem;margin-bottom:1rem;
-                    border-left:5px solid {dim['color']};box-shadow:0 2px 8px rgba(0,0,0,0.07)">
-          <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:6px">
-            <span style="font-weight:700;font-size:1rem">{dim['icon']} {dim['name']}</span>
-            <span style="background:{lc};color:white;padding:3px 12px;border-radius:999px;
-                         font-size:0.73rem;font-weight:700">{label.upper()}</span>
-          </div>
-          <div style="font-size:0.78rem;color:#94A3B8;font-style:italic;margin-bottom:8px">{dim['tagline']}</div>
-          <div style="font-size:1.9rem;font-weight:800;color:#1E293B;font-family:Georgia,serif;margin-bottom:6px">
-            {s}<span style="font-size:1rem;font-weight:400;color:#94A3B8"> / 20</span></div>
-          <div style="background:#E2E8F0;border-radius:999px;height:7px;margin-bottom:10px">
-            <div style="background:{dim['color']};width:{pct:.0f}%;height:7px;border-radius:999px"></div></div>
-          <p style="margin:0;font-size:0.88rem;color:#475569;line-height:1.75">{dim['feedback'][ti]}</p>
-        </div>"""
-    return f"""<!DOCTYPE html>
-<html lang="en"><head>
-<meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
-<title>Boundary Crossing Diagnostic — {name}</title>
-<style>
-  @import url('https://fonts.googleapis.com/css2?family=Lora:wght@400;700&family=DM+Sans:wght@400;500;600&display=swap');
-  body{{font-family:'DM Sans',sans-serif;max-width:680px;margin:40px auto;padding:0 24px;color:#1E293B;background:#F8FAFC}}
-  .hdr{{background:linear-gradient(135deg,#0F172A,#1E3A8A,#2563EB);border-radius:16px;padding:2.2rem 2rem;color:white;margin-bottom:1.5rem}}
-  .hdr .lbl{{font-size:0.62rem;letter-spacing:3px;text-transform:uppercase;opacity:0.6;margin-bottom:0.6rem}}
-  .hdr h1{{margin:0;font-size:1.7rem;font-family:'Lora',Georgia,serif;font-weight:700}}
-  .hdr .meta{{margin:8px 0 0;opacity:0.8;font-size:0.88rem}}
-  .reflect{{background:#EFF6FF;border-left:4px solid #2563EB;border-radius:8px;padding:1.1rem 1.3rem;margin:1.25rem 0}}
-  .reflect h3{{margin:0 0 0.5rem;color:#1D4ED8;font-size:0.88rem;text-transform:uppercase;letter-spacing:1px}}
-  .reflect p{{margin:0;color:#475569;font-size:0.9rem;line-height:1.75;font-style:italic}}
-  .footer{{text-align:center;font-size:0.78rem;color:#CBD5E1;margin-top:2rem;padding-top:1rem;border-top:1px solid #E2E8F0}}
-</style></head><body>
-  <div class="hdr">
-    <div class="lbl">MBX · Boundary-Crossing Learning and Leadership · IAL/SUSS</div>
-    <h1>🔀 Boundary Crossing Diagnostic</h1>
-    <div class="meta">{meta}</div>
-  </div>
-  <p style="color:#475569;font-size:0.9rem;line-height:1.75;margin-bottom:1.25rem">
-    Based on your responses to 20 situational scenarios across five organisational levels 
-    (systemic, team, leader–subordinate, individual mindset, and technology). 
-    Scores reflect developmental tendencies, not fixed traits — and are most useful 
-    as a starting point for reflection rather than a final verdict.
-  </p>
-  {rows}
-  <div class="reflect">
-    <h3>💭 Reflection Prompt</h3>
-    <p>Which dimension surprised you — either higher or lower than you expected? 
-    Looking at your lowest dimension: which of the five organisational levels 
-    felt most difficult in the scenarios? What does that tell you about 
-    where crossing boundaries is hardest in your current role and context?
-    What is one specific tension you have been managing around rather than attending to?</p>
-  </div>
-  <div class="footer">MBX Boundary Crossing Diagnostic · IAL/SUSS · {now}<br>
-    Inspired by Akkerman &amp; Bakker (2011).</div>
-</body></html>"""
+class FigureCache:
+    BUILDERS = {
+        "radar": lambda scores, dims: make_radar([scores], ["Your profile"], dims=dims),
+        "bar":   lambda scores, dims: make_bar(scores, dims),
+    }
+
+    def __init__(self, maxsize: int = 4096):
+        self._data   = OrderedDict()
+        self._lock   = threading.Lock()
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def _key(kind, scores, bank):
+        return kind, bank.digest, tuple(int(scores[k]) for k in DIM_KEYS)
+
+    def get(self, kind: str, scores: dict, bank: Bank):
+        key = self._key(kind, scores, bank)
+        with self._lock:
+            fig = self._data.get(key)
+            if fig is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return fig
+            self.misses += 1
+        return self._build(key)
+
+    def _build(self, key):
+        kind, digest, vec = key
+        fig = self.BUILDERS[kind](dict(zip(DIM_KEYS, vec)), bank_by_digest(digest).dimensions)
+        with self._lock:
+            self._data[key] = fig
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return fig
+
+    def prewarm(self, profiles, bank):
+        """Build figures for *profiles* without touching the hit/miss counters."""
+        for scores in profiles:
+            for kind in self.BUILDERS:
+                key = self._key(kind, scores, bank)
+                if key not in self._data:
+                    self._build(key)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+def popular_profiles(store, n: int) -> list:
+    """The n most frequent score vectors so far, topped up from the centre of the 5–20 range."""
+    keys   = list(DIMENSIONS.keys())
+    seen   = Counter(tuple(r["scores"][k] for k in keys) for r in store.rows())
+    ranked = [v for v, _ in seen.most_common(n)]
+    if len(ranked) < n:
+        grid = sorted(itertools.product(range(10, 18), repeat=len(keys)),
+                      key=lambda v: sum((x - 13.5) ** 2 for x in v))
+        ranked += [v for v in grid if v not in seen][:n - len(ranked)]
+    return [dict(zip(keys, v)) for v in ranked]
+
+
+@st.cache_resource
+def get_figure_cache():
+    cache = FigureCache(int(_secret("FIGURE_CACHE_SIZE", 4096)))
+    profiles = popular_profiles(get_class_store(), int(_secret("FIGURE_PREWARM", 64)))
+    threading.Thread(target=cache.prewarm, args=(profiles, BANK), name="figure-prewarm",
+                     daemon=True).start()
+    return cache
+
+# ─────────────────────────────────────────────────────────────────────────────
+# STATIC ASSETS
+# The stylesheet (assets/app.css) goes out once through Streamlit static
+# serving under a content-hashed name, so a rerun only sends a one-line @import.
+# ─────────────────────────────────────────────────────────────────────────────
+STATIC_DIR = os.path.join(APP_DIR, "static")
+
+@st.cache_resource
+def stylesheet_url():
+    """(url, css): writes static/app.<hash>.css once per process; url is None when static serving is off."""
+    with open(os.path.join(APP_DIR, "assets", "app.css"), encoding="utf-8") as f:
+        css = f.read()
+    if not st.get_option("server.enableStaticServing"):
+        return None, css
+    name = f"app.{content_digest(css.encode())}.css"
+    path = os.path.join(STATIC_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(css)
+        os.replace(path + ".tmp", path)
+    return f"app/static/{name}", css
 
 # ─────────────────────────────────────────────────────────────────────────────
 # CSS
 # ─────────────────────────────────────────────────────────────────────────────
+@timed("apply_css")
 def apply_css():
-    st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Lora:ital,wght@0,400;0,700;1,400&family=DM+Sans:wght@300;400;500;600;700&display=swap');
-html,body,[class*="css"]{font-family:'DM Sans',sans-serif;}
-.main{background:#F8FAFC;}
-.block-container{padding-top:1.5rem!important;max-width:720px!important;padding-bottom:3rem!important;}
-#MainMenu,header,footer{visibility:hidden;}
-.hero{background:linear-gradient(135deg,#0F172A 0%,#1E3A8A 55%,#2563EB 100%);
-      border-radius:18px;padding:2.6rem 2.2rem;color:white;margin-bottom:1.5rem;
-      text-align:center;position:relative;overflow:hidden;}
-.hero::before{content:'';position:absolute;top:-60%;right:-15%;width:320px;height:320px;
-              background:rgba(255,255,255,0.03);border-radius:50%;}
-.hero-label{font-size:0.62rem;letter-spacing:3px;text-transform:uppercase;opacity:0.6;margin-bottom:0.8rem;}
-.hero h1{font-family:'Lora',Georgia,serif;font-size:2rem;font-weight:700;margin:0;line-height:1.2;}
-.hero p{font-size:0.92rem;opacity:0.8;margin:0.85rem auto 0;line-height:1.65;max-width:500px;}
-.card{background:white;border-radius:14px;padding:1.3rem 1.5rem;margin-bottom:1rem;
-      box-shadow:0 1px 6px rgba(15,23,42,0.07);border:1px solid rgba(226,232,240,0.8);}
-.sc-level{font-size:0.72rem;font-weight:700;letter-spacing:1.5px;text-transform:uppercase;
-          color:#94A3B8;margin-bottom:0.4rem;}
-.sc-title{font-family:'Lora',Georgia,serif;font-size:1.1rem;font-weight:700;color:#1E293B;margin-bottom:0.5rem;}
-.sc-context{font-size:0.91rem;color:#475569;line-height:1.8;}
-.sc-prompt{font-size:0.86rem;font-weight:600;color:#1E293B;
-           border-left:3px solid #2563EB;padding-left:0.75rem;margin:0.85rem 0 0.6rem;
-           font-style:italic;}
-.prog-wrap{margin-bottom:1.25rem;}
-.prog-label{display:flex;justify-content:space-between;font-size:0.78rem;color:#64748B;margin-bottom:5px;}
-.prog-bg{background:#E2E8F0;border-radius:999px;height:5px;}
-.prog-fill{height:5px;border-radius:999px;background:linear-gradient(90deg,#1E40AF,#3B82F6);}
-.r-card{background:white;border-radius:14px;padding:1.2rem 1.5rem;margin-bottom:0.85rem;
-        box-shadow:0 2px 8px rgba(15,23,42,0.07);border:1px solid rgba(226,232,240,0.8);}
-.r-header{display:flex;justify-content:space-between;align-items:flex-start;margin-bottom:0.5rem;}
-.r-name{font-weight:700;font-size:1rem;color:#1E293B;}
-.r-tagline{font-size:0.78rem;color:#94A3B8;margin-top:3px;font-style:italic;}
-.r-badge{color:white;padding:3px 12px;border-radius:999px;font-size:0.71rem;font-weight:700;
-         letter-spacing:0.5px;white-space:nowrap;}
-.r-score{font-family:'Lora',Georgia,serif;font-size:2rem;font-weight:700;color:#1E293B;
-         margin-bottom:5px;line-height:1;}
-.r-score span{font-family:'DM Sans',sans-serif;font-size:1rem;font-weight:400;color:#94A3B8;}
-.r-bar-bg{background:#E2E8F0;border-radius:999px;height:6px;margin-bottom:0.85rem;}
-.r-bar-fill{height:6px;border-radius:999px;}
-.level-pills{display:flex;gap:0.4rem;flex-wrap:wrap;margin-bottom:0.85rem;}
-.pill{background:#F1F5F9;border-radius:6px;padding:3px 10px;font-size:0.72rem;font-weight:600;color:#475569;}
-.pill.best{background:#D1FAE5;color:#065F46;}
-.pill.low{background:#FEF3C7;color:#92400E;}
-.r-text{font-size:0.88rem;color:#475569;line-height:1.8;margin:0;}
-.reflect-box{background:#EFF6FF;border-left:4px solid #2563EB;border-radius:10px;
-             padding:1.1rem 1.4rem;margin:1.25rem 0;}
-.reflect-title{font-weight:700;color:#1D4ED8;font-size:0.85rem;margin-bottom:0.5rem;}
-.reflect-text{font-size:0.9rem;color:#475569;line-height:1.8;margin:0;font-style:italic;}
-.confirm-box{background:linear-gradient(135deg,#064E3B,#059669);border-radius:14px;
-             padding:1.5rem 2rem;color:white;text-align:center;margin:1rem 0;}
-.confirm-box h3{margin:0 0 0.4rem;font-size:1.1rem;}
-.confirm-box p{margin:0;opacity:0.85;font-size:0.88rem;}
-.stButton>button{background:linear-gradient(135deg,#1E3A8A,#2563EB)!important;
-    color:white!important;border:none!important;border-radius:10px!important;
-    padding:0.62rem 1.5rem!important;font-weight:600!important;font-size:0.93rem!important;
-    width:100%!important;font-family:'DM Sans',sans-serif!important;transition:all 0.2s!important;}
-.stButton>button:hover{transform:translateY(-1px)!important;box-shadow:0 6px 18px rgba(37,99,235,0.3)!important;}
-div[data-testid="stRadio"]>label{display:none!important;}
-div[data-testid="stRadio"] div[role="radiogroup"]{flex-direction:column!important;gap:0.5rem!important;}
-div[data-testid="stRadio"] div[role="radiogroup"] label{
-    background:#F8FAFC;border-radius:10px;padding:0.75rem 1rem!important;
-    font-size:0.9rem!important;color:#334155!important;
-    border:1.5px solid #E2E8F0;transition:all 0.15s;cursor:pointer;width:100%;}
-div[data-testid="stRadio"] div[role="radiogroup"] label:hover{background:#EFF6FF;border-color:#93C5FD;}
-div[data-testid="stRadio"] div[role="radiogroup"] label:has(input:checked){
-    background:#EFF6FF;border-color:#2563EB;color:#1D4ED8!important;font-weight:600;}
-.stTextInput>div>div>input{border-radius:10px!important;border:1.5px solid #E2E8F0!important;
-    font-family:'DM Sans',sans-serif!important;font-size:0.95rem!important;
-    padding:0.6rem 1rem!important;background:white!important;}
-.stTextInput>div>div>input:focus{border-color:#2563EB!important;box-shadow:0 0 0 3px rgba(37,99,235,0.1)!important;}
-section[data-testid="stSidebar"]{background:#0F172A!important;}
-section[data-testid="stSidebar"] *{color:white!important;}
-section[data-testid="stSidebar"] .stTextInput>div>div>input{
-    background:rgba(255,255,255,0.1)!important;border-color:rgba(255,255,255,0.2)!important;color:white!important;}
-details{border-radius:10px!important;background:white!important;border:1px solid #E2E8F0!important;}
-</style>""", unsafe_allow_html=True)
+    url, css = stylesheet_url()
+    if url:
+        st.markdown(f"<style>@import url('{url}');</style>", unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>\n{css}</style>", unsafe_allow_html=True)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # SESSION STATE
+# A participant's quiz state is a seed (scenario and option shuffles are
+# re-derived from it by shuffle_plan) and a 20-byte packed answer array.
+# Sessions that go quiet for SESSION_IDLE_MINUTES have their state dropped,
+# so tabs left open after class stop holding memory; they return to the
+# welcome page on their next interaction. The registry holds each session's
+# SessionState (the object its AppSession owns across reruns, not the per-run
+# wrapper) and forgets it at the first sweep after the runtime closes the
+# session, so a closed tab's state outlives the runtime's by SWEEP_EVERY at most.
 # ─────────────────────────────────────────────────────────────────────────────
+class SessionRegistry:
+    SWEEP_EVERY = 30.0   # seconds between idle sweeps
+
+    def __init__(self, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self._lock  = threading.Lock()
+        self._seen  = {}   # session id -> (last activity, that session's SessionState)
+        self._swept = time.monotonic()
+        self.evicted = 0
+
+    @staticmethod
+    def _closed(session_id) -> bool:
+        """True once the runtime has dropped the session (its disconnect grace period is over)."""
+        return Runtime.exists() and not Runtime.instance().is_active_session(session_id)
+
+    def touch(self, session_id, state):
+        now = time.monotonic()
+        with self._lock:
+            self._seen[session_id] = (now, state)
+            if now - self._swept < self.SWEEP_EVERY:
+                return
+            self._swept = now
+            idle = []
+            for sid, (seen, kept) in list(self._seen.items()):
+                if self._closed(sid):
+                    del self._seen[sid]
+                elif now - seen > self.idle_timeout:
+                    del self._seen[sid]
+                    idle.append(kept)
+        for state in idle:
+            for k in list(state.filtered_state):
+                try:
+                    del state[k]
+                except KeyError:
+                    pass
+        self.evicted += len(idle)
+
+    def __len__(self):
+        return len(self._seen)
+
+
+@st.cache_resource
+def get_session_registry():
+    return SessionRegistry(float(_secret("SESSION_IDLE_MINUTES", 90)) * 60)
+
+def touch_session():
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        # ctx.session_state is rebuilt for every run; _state is the session's own store.
+        get_session_registry().touch(ctx.session_id, ctx.session_state._state)
+
 def init_state():
+    if "seed" not in st.session_state:
+        restore_session()
     defaults = {
-        "page": "welcome", "q_idx": 0, "order": None,
-        "answers": {}, "opt_orders": {},
+        "page": "welcome", "q_idx": 0, "seed": None, "bank": None, "layout": None,
+        "answers": session_bank().new_answers(),
         "name": "", "class_code": "",
         "submitted": False, "fac_mode": False,
     }
     for k, v in defaults.items():
         if k not in st.session_state:
             st.session_state[k] = v
+    touch_session()
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RESUMABLE SESSIONS
+# Each answer checkpoints the quiz to a small server-side record keyed by a
+# short resume token that also sits in the URL (?r=…). A reconnect that
+# lands in a fresh session finds the token in its query string and is
+# restored in one lookup. That covers a dropped socket, a sleeping laptop,
+# an idle eviction, or another replica sharing the SQLite store. Records
+# untouched for RESUME_TTL_HOURS are deleted.
+# ─────────────────────────────────────────────────────────────────────────────
+CHECKPOINT_FIELDS = ("seed", "q_idx", "page", "submitted", "name", "class_code", "answers", "bank", "layout")
+
+class MemoryCheckpoints:
+    def __init__(self, ttl: float):
+        self.ttl   = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()   # token -> (saved at, record), oldest first
+
+    def save(self, token: str, rec: dict):
+        now = time.time()
+        with self._lock:
+            self._data[token] = (now, rec)
+            self._data.move_to_end(token)
+            while now - next(iter(self._data.values()))[0] > self.ttl:
+                self._data.popitem(last=False)
+
+    def load(self, token: str):
+        with self._lock:
+            saved, rec = self._data.get(token, (0.0, None))
+        return rec if time.time() - saved <= self.ttl else None
+
+    def delete(self, token: str):
+        with self._lock:
+            self._data.pop(token, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCheckpoints:
+    GC_EVERY = 300.0   # seconds between sweeps of expired records
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl   = ttl
+        self._lock = threading.Lock()
+        self._db   = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    token      TEXT    PRIMARY KEY,
+                    updated_at REAL    NOT NULL,
+                    seed       INTEGER NOT NULL,
+                    q_idx      INTEGER NOT NULL,
+                    page       TEXT    NOT NULL,
+                    submitted  INTEGER NOT NULL,
+                    name       TEXT    NOT NULL,
+                    class_code TEXT    NOT NULL,
+                    answers    BLOB    NOT NULL,
+                    bank       TEXT,
+                    layout     TEXT
+                ) WITHOUT ROWID""")
+            have = {r[1] for r in self._db.execute("PRAGMA table_info(checkpoints)")}
+            for col in ("bank", "layout"):   # tables created before scenario banks were pinned
+                if col not in have:
+                    self._db.execute(f"ALTER TABLE checkpoints ADD COLUMN {col} TEXT")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_checkpoints_updated "
+                             "ON checkpoints (updated_at)")
+        self._gc_at = 0.0
+
+    def save(self, token: str, rec: dict):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(f"INSERT OR REPLACE INTO checkpoints (token, updated_at, {', '.join(CHECKPOINT_FIELDS)}) "
+                             f"VALUES ({', '.join('?' * (len(CHECKPOINT_FIELDS) + 2))})",
+                             (token, now, *(rec[k] for k in CHECKPOINT_FIELDS)))
+            if now - self._gc_at > self.GC_EVERY:
+                self._gc_at = now
+                self._db.execute("DELETE FROM checkpoints WHERE updated_at < ?", (now - self.ttl,))
+
+    def load(self, token: str):
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(CHECKPOINT_FIELDS)} FROM checkpoints "
+                                   f"WHERE token = ? AND updated_at >= ?",
+                                   (token, time.time() - self.ttl)).fetchone()
+        return dict(zip(CHECKPOINT_FIELDS, row)) if row else None
+
+    def delete(self, token: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM checkpoints WHERE token = ?", (token,))
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+
+
+@st.cache_resource
+def get_checkpoints():
+    ttl = float(_secret("RESUME_TTL_HOURS", 24)) * 3600
+    if _secret("CLASS_STORE", "memory") == "sqlite":
+        return SQLiteCheckpoints(_secret("CLASS_STORE_PATH", "class_store.db"), ttl)
+    return MemoryCheckpoints(ttl)
+
+def start_resumable():
+    """Issue a resume token for a new attempt, put it in the URL and take the first checkpoint."""
+    st.session_state.resume = secrets.token_urlsafe(8)
+    st.query_params["r"]    = st.session_state.resume
+    checkpoint()
+
+def checkpoint():
+    token = st.session_state.get("resume")
+    if token:
+        rec = {k: st.session_state[k] for k in CHECKPOINT_FIELDS}
+        rec["answers"] = bytes(rec["answers"])
+        get_checkpoints().save(token, rec)
+
+def restore_session() -> bool:
+    token = st.query_params.get("r")
+    rec   = get_checkpoints().load(token) if token else None
+    if rec is None:
+        return False
+    if bank_by_digest(rec["bank"]) is None:
+        # Pinned bank not loaded in this process (its file was edited before a restart):
+        # carry on with the active bank only if its scenarios line up with the saved answers.
+        bank = active_bank()
+        if rec["layout"] not in (None, bank.layout) or len(rec["answers"]) != len(bank.scenarios):
+            return False
+        rec["bank"], rec["layout"] = bank.digest, bank.layout
+    for k in CHECKPOINT_FIELDS:
+        st.session_state[k] = rec[k]
+    st.session_state.answers   = bytearray(rec["answers"])
+    st.session_state.submitted = bool(rec["submitted"])
+    st.session_state.resume    = token
+    return True
+
+def end_resumable():
+    token = st.session_state.pop("resume", None)
+    if token:
+        get_checkpoints().delete(token)
+    st.query_params.pop("r", None)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # SIDEBAR
@@ -779,11 +1522,14 @@ def facilitator_sidebar():
             if st.button("Exit"):
                 st.session_state.fac_mode = False
                 st.rerun()
+            fc = get_figure_cache().stats()
+            st.caption(f"Chart cache: {fc['hits']} hits · {fc['misses']} misses · {fc['size']} figures")
             st.markdown("---")
             store = get_class_store()
-            if store and st.button("🗑 Clear In-Memory Results"):
+            if store and st.button("🗑 Clear Stored Results (keeps cohort summaries)"):
                 store.clear()
                 st.rerun()
+            st.caption("Cohort summaries hold no names; forget one under 📊 Compare Cohorts.")
             st.markdown("---")
             st.markdown("**📋 Google Sheets Setup**")
             st.markdown("""
@@ -810,42 +1556,221 @@ GOOGLE_SHEET_URL = "https://script.google.com/..."
 ```
 """)
 
+# ─────────────────────────────────────────────────────────────────────────────
+# BULK REPORTS
+# Every participant's html_report for one cohort, rendered in a process pool
+# and written into a ZIP as each report comes back. Rows come from the store
+# a chunk at a time, and at most two chunks per worker are rendering at once,
+# so neither the rows nor the rendered reports are ever all in memory; only
+# the compressed archive is, as the bytes st.download_button serves. A
+# report renders in tens of microseconds, so cohorts smaller than one chunk
+# and single-core hosts skip the pool's IPC and render in-process.
+# ─────────────────────────────────────────────────────────────────────────────
+POOL_MIN_REPORTS = 64   # also the chunk size handed to each pool task
+
+@st.cache_resource
+def get_report_pool():
+    if (os.cpu_count() or 1) < 2:
+        return None
+    return ProcessPoolExecutor(max_workers=os.cpu_count(),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+@timed("cohort_reports_zip")
+def cohort_reports_zip(chunks, pool=None) -> bytes:
+    """ZIP of reports for *chunks*, an iterable of row lists such as store.iter_chunks(code, POOL_MIN_REPORTS)."""
+    out     = io.BytesIO()
+    chunks  = iter(chunks)
+    first   = next(chunks, [])
+    if len(first) < POOL_MIN_REPORTS:
+        pool = None
+    window  = 2 * (os.cpu_count() or 1)
+    pending = deque()   # (rows, future or rendered reports), oldest first
+    i = 0
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        def write(rows, reports):
+            nonlocal i
+            for r, report in zip(rows, reports):
+                i += 1
+                safe = re.sub(r"[^\w\-]+", "_", r["name"]).strip("_") or "participant"
+                zf.writestr(f"{i:03d}_BC_Diagnostic_{safe}.html", report)
+
+        for rows in itertools.chain([first], chunks):
+            if pool is None:
+                write(rows, html_reports(rows, DIMENSIONS))
+                continue
+            pending.append((rows, pool.submit(html_reports, rows, DIMENSIONS)))
+            while len(pending) >= window:
+                rows, fut = pending.popleft()
+                write(rows, fut.result())
+        while pending:
+            rows, fut = pending.popleft()
+            write(rows, fut.result())
+    return out.getvalue()
+
+# ─────────────────────────────────────────────────────────────────────────────
+# EXPORT
+# Class results in CSV, JSON Lines or Parquet, built only when the download
+# is clicked. Rows are pulled from the store a chunk at a time and encoded
+# straight into one output buffer, so a research export of tens of thousands
+# of rows is never also held as one list, DataFrame or string. The finished
+# file itself is in memory: st.download_button serves it as bytes. All three
+# formats share one flat schema with the dimension scores as integers.
+# ─────────────────────────────────────────────────────────────────────────────
+EXPORT_CHUNK = 5000
+EXPORT_FORMATS = {   # label -> (file extension, mime type)
+    "CSV":         ("csv",     "text/csv"),
+    "JSON Lines":  ("jsonl",   "application/x-ndjson"),
+    "Parquet":     ("parquet", "application/vnd.apache.parquet"),
+}
+
+def _export_columns(chunk):
+    cols = {"name":       [r["name"] for r in chunk],
+            "class_code": [r.get("class_code", "") for r in chunk],
+            "timestamp":  [r["timestamp"] for r in chunk]}
+    for k in DIMENSIONS:
+        cols[k] = [r["scores"][k] for r in chunk]
+    return cols
+
+@timed("export")
+def export_results(store, class_code, fmt: str) -> bytes:
+    out    = io.BytesIO()
+    chunks = store.iter_chunks(class_code, EXPORT_CHUNK)
+    header = ["name", "class_code", "timestamp"] + list(DIMENSIONS)
+    if fmt == "Parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([(c, pa.string()) for c in header[:3]] + [(k, pa.int8()) for k in DIMENSIONS])
+        with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+            for chunk in chunks:
+                writer.write_table(pa.table(_export_columns(chunk), schema=schema))
+    else:
+        text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+        if fmt == "CSV":
+            w = csv.writer(text)
+            w.writerow(header)
+            for chunk in chunks:
+                w.writerows(zip(*_export_columns(chunk).values()))
+        else:
+            for chunk in chunks:
+                text.writelines(json.dumps(dict(zip(header, row)), ensure_ascii=False) + "\n"
+                                for row in zip(*_export_columns(chunk).values()))
+        text.detach()
+    return out.getvalue()
+
 # ─────────────────────────────────────────────────────────────────────────────
 # FACILITATOR DASHBOARD
+# Stays live on a projector: a tiny fragment polls the store's version
+# counter every DASHBOARD_REFRESH seconds and does nothing else unless it
+# has moved. Then the page reruns and cohort_view() appends just the
+# submissions newer than the version this session last saw.
 # ─────────────────────────────────────────────────────────────────────────────
+def _table_row(r):
+    row = {"Name": r["name"], "Time": r["timestamp"]}
+    for k in DIMENSIONS:
+        row[DIMENSIONS[k]["name"]] = f"{r['scores'][k]}/20"
+    row["Class Code"] = r.get("class_code","—")
+    return row
+
+def cohort_view(store, code, version) -> dict:
+    """This session's submissions and table rows for *code*, folding in only rows newer than
+    the last version it saw (rebuilt after a cohort switch, a clear or a replaced submission in *code*)."""
+    view = st.session_state.get("fac_view")
+    if view is None or view["code"] != code or store.rewritten_at(code) > view["version"]:
+        view = st.session_state.fac_view = {"code": code, "version": 0, "subs": [], "table": []}
+    if version != view["version"]:
+        new = store.rows_since(view["version"], code, until=version)
+        view["subs"]  += new
+        view["table"] += map(_table_row, new)
+        view["version"] = version
+    return view
+
+def dashboard_watch(seen: int):
+    """Runs every DASHBOARD_REFRESH seconds: one version read, and a full rerun only if it moved."""
+    if get_class_store().version != seen:
+        st.rerun()
+
+@timed("show_facilitator")
 def show_facilitator():
+    import pandas as pd
     store = get_class_store()
     st.markdown("""
     <div class="hero" style="text-align:left;padding:1.8rem 2rem">
       <div class="hero-label">Facilitator Dashboard · MBX</div>
       <h1 style="font-size:1.5rem">🎓 Class Results</h1>
     </div>""", unsafe_allow_html=True)
-    if not store:
+    st.caption(f"Scenario bank v{BANK.version} ({BANK.digest}) · new attempts use it; "
+               f"attempts already under way finish on the bank they began with.")
+    for err in get_bank_watcher().errors.values():
+        st.warning(f"Scenario bank not loaded — {err}")
+    version = store.version
+    refresh = float(_secret("DASHBOARD_REFRESH", 5))
+    if refresh > 0:
+        st.fragment(run_every=refresh)(dashboard_watch)(version)
+    codes = store.class_codes()
+    if not codes:
         st.info("📭 No submissions yet.")
         return
-    st.metric("Participants submitted", len(store))
-    keys = list(DIMENSIONS.keys())
-    all_s = [r["scores"] for r in store]
-    avg   = {k: round(sum(s[k] for s in all_s)/len(all_s),1) for k in keys}
+    code  = st.selectbox("Cohort", codes, key="fac_cohort",
+                         format_func=lambda c: c or "(no class code)")
+    view  = cohort_view(store, code, version)
+    subs  = view["subs"]
+    stats = store.stats.summary(code)
+    st.metric("Participants submitted", stats["count"])
+    if not stats["count"]:   # cleared (maybe by another process) since the cohort list was read
+        st.info("📭 No submissions in this cohort any more.")
+        return
+    saved, offered, n = store.items_saved(code)
+    if saved:
+        st.caption(f"⏱ Adaptive short form: {saved} scenario{'s' * (saved != 1)} skipped across {n} "
+                   f"participants ({saved / n:.1f} each, {saved / offered:.0%} of items).")
+    keys  = list(DIMENSIONS.keys())
+    avg   = {k: round(stats["mean"][k], 1) for k in keys}
+    svg   = st.toggle("Lightweight charts (static SVG, no Plotly)", key="fac_svg")
+    bands = stats["count"] > int(_secret("RADAR_BAND_THRESHOLD", 30))
     col1, col2 = st.columns(2)
     with col1:
-        st.plotly_chart(make_radar([avg],["Class Average"],"Class Average"), use_container_width=True)
+        if svg:
+            st.markdown(svg_radar([avg], "Class Average", dims=DIMENSIONS), unsafe_allow_html=True)
+        else:
+            st.plotly_chart(make_radar([avg],["Class Average"],"Class Average"), use_container_width=True)
     with col2:
-        labels = [r["name"].split()[0] for r in store]
-        st.plotly_chart(make_radar(all_s, labels, "All Participants"), use_container_width=True)
+        if svg and bands:
+            st.markdown(svg_radar_bands(store.stats.quantiles(code), "All Participants", dims=DIMENSIONS),
+                        unsafe_allow_html=True)
+        elif svg:
+            st.markdown(svg_radar([r["scores"] for r in subs], "All Participants", dims=DIMENSIONS),
+                        unsafe_allow_html=True)
+        elif bands:
+            st.plotly_chart(make_radar_bands(store.stats.quantiles(code)), use_container_width=True)
+        else:
+            labels = [r["name"].split()[0] for r in subs]
+            st.plotly_chart(make_radar([r["scores"] for r in subs], labels, "All Participants"),
+                            use_container_width=True)
+    st.markdown("#### Dimension Summary")
+    st.dataframe(pd.DataFrame({
+        "Dimension": [f"{DIMENSIONS[k]['icon']} {DIMENSIONS[k]['name']}" for k in keys],
+        "Mean":      [stats["mean"][k] for k in keys],
+        "SD":        [stats["std"][k]  for k in keys],
+        "Min":       [int(stats["min"][k]) for k in keys],
+        "Max":       [int(stats["max"][k]) for k in keys],
+    }), use_container_width=True, hide_index=True,
+       column_config={"Mean": st.column_config.NumberColumn(format="%.1f"),
+                      "SD":   st.column_config.NumberColumn(format="%.1f")})
     st.markdown("#### Individual Scores")
-    rows = []
-    for r in store:
-        row = {"Name": r["name"], "Time": r["timestamp"]}
-        for k in keys:
-            row[DIMENSIONS[k]["name"]] = f"{r['scores'][k]}/20"
-        row["Class Code"] = r.get("class_code","—")
-        rows.append(row)
-    df = pd.DataFrame(rows)
+    with span("facilitator_table"):
+        df = pd.DataFrame(view["table"])
     st.dataframe(df, use_container_width=True, hide_index=True)
-    st.download_button("📥 Download CSV", data=df.to_csv(index=False),
-                       file_name=f"mbx_diagnostic_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                       mime="text/csv")
+    fmt = st.segmented_control("Export format", list(EXPORT_FORMATS), default="CSV",
+                               key="fac_export_fmt", label_visibility="collapsed") or "CSV"
+    ext, mime = EXPORT_FORMATS[fmt]
+    st.download_button(f"📥 Download {fmt}", data=lambda: export_results(store, code, fmt),
+                       file_name=f"mbx_diagnostic_{code or 'no_code'}_{datetime.now().strftime('%Y%m%d_%H%M')}.{ext}",
+                       mime=mime)
+    pool = get_report_pool()
+    st.download_button(f"🗂 Download All {len(subs)} Reports (ZIP)",
+                       data=lambda: cohort_reports_zip(store.iter_chunks(code, POOL_MIN_REPORTS), pool),
+                       file_name=f"mbx_reports_{code or 'no_code'}_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                       mime="application/zip")
     st.markdown("---")
     st.markdown("#### 💬 Debrief Starters")
     sd = sorted(keys, key=lambda k: avg[k])
@@ -867,9 +1792,177 @@ def show_facilitator():
       What tension in that scenario do we keep managing around rather than attending to?</span>
     </div>""", unsafe_allow_html=True)
 
+# ─────────────────────────────────────────────────────────────────────────────
+# COHORT COMPARISON
+# Any set of cohorts overlaid on one radar, their means over time and their
+# summary rows side by side, all read from store.cohort_summaries() — a few
+# rows per cohort — rather than from raw submissions, and still there for
+# cohorts whose stored results have been cleared.
+# ─────────────────────────────────────────────────────────────────────────────
+def forget_cohort_form(rows: dict, label):
+    """Lets the facilitator delete the summary of a cohort whose stored results are gone."""
+    store = get_class_store()
+    live  = set(store.class_codes())
+    idle  = [c for c in rows if c not in live]
+    if not idle:
+        return
+    col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
+    code = col1.selectbox("Forget a cohort's summary", idle, index=None, format_func=label,
+                          key="fac_forget", placeholder="Cohorts with no stored results")
+    if col2.button("Forget", disabled=code is None, key="fac_forget_go") and store.forget_cohort(code):
+        st.rerun()
+
+def comparison_panel():
+    import pandas as pd
+    with st.expander("📊 Compare Cohorts"):
+        rows  = {r["class_code"]: r for r in get_class_store().cohort_summaries()}
+        label = lambda c: c or "(no class code)"
+        if len(rows) < 2:
+            st.caption("Comparisons open up once a second cohort has submitted. Cohort summaries are "
+                       "kept when stored results are cleared, so earlier classes stay comparable.")
+            forget_cohort_form(rows, label)
+            return
+        default = list(rows)[-4:]
+        current = st.session_state.get("fac_cohort")
+        if current in rows and current not in default:
+            default = default[1:] + [current]
+        picked = st.multiselect("Cohorts", list(rows), default=[c for c in rows if c in default],
+                                format_func=label, key="fac_compare")
+        chosen = [rows[c] for c in rows if c in picked]   # oldest first, whatever the pick order
+        if not chosen:
+            st.caption("Pick one or more cohorts.")
+            forget_cohort_form(rows, label)
+            return
+        keys = list(DIMENSIONS.keys())
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(make_radar([{k: round(r["mean"][k], 1) for k in keys} for r in chosen],
+                                       [label(r["class_code"]) for r in chosen], "Cohort Comparison"),
+                            use_container_width=True)
+        with col2:
+            st.plotly_chart(make_cohort_trend(chosen), use_container_width=True)
+        day = lambda t: datetime.fromtimestamp(t).strftime("%d %b %Y")
+        st.dataframe(pd.DataFrame([{
+            "Cohort": label(r["class_code"]), "Responses": r["count"],
+            "First": day(r["first_at"]), "Last": day(r["last_at"]),
+            **{f"{DIMENSIONS[k]['icon']} {DIMENSIONS[k]['name']}": f"{r['mean'][k]:.1f} ± {r['var'][k] ** 0.5:.1f}"
+               for k in keys},
+        } for r in chosen]), use_container_width=True, hide_index=True)
+        st.markdown("#### Tier Distribution")
+        tiers = [name for name, _ in TIERS]
+        st.dataframe(pd.DataFrame([{
+            "Cohort": label(r["class_code"]), "Dimension": f"{DIMENSIONS[k]['icon']} {DIMENSIONS[k]['name']}",
+            **{t: 100 * r["tiers"][k][t] / r["count"] for t in tiers},
+        } for r in chosen for k in keys]), use_container_width=True, hide_index=True,
+           column_config={t: st.column_config.NumberColumn(format="%.0f%%") for t in tiers})
+        st.caption("Mean ± SD out of 20. Each cohort is one summary row per dimension, updated as "
+                   "submissions arrive and kept when stored results are cleared.")
+        forget_cohort_form(rows, label)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# INSTRUMENT ANALYTICS
+# With ITEM_LOG = true, participants can tick a box to add their scenario
+# choices, tagged with the scenario bank they answered, to an item-level log.
+# The choices ride on the submission (a retake replaces them) until class
+# results are cleared; then they move to an archive with no name, key or
+# time, in shuffled order, with small class codes pooled (archive_items).
+# That is de-identified, not anonymous: the choices still add up to the
+# scores in the results sheet. The facilitator view runs
+# psychometrics.analyse() over the active bank's log, cached per store version.
+# ─────────────────────────────────────────────────────────────────────────────
+ITEM_LOG = _flag("ITEM_LOG")
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def instrument_stats(class_code, version, digest) -> dict:
+    bank = bank_by_digest(digest)
+    return psychometrics.analyse(get_class_store().responses(bank, class_code), bank)
+
+def instrument_panel():
+    import pandas as pd
+    with st.expander("📐 Instrument Analytics"):
+        if not ITEM_LOG:
+            st.caption("Set `ITEM_LOG = true` in secrets to collect item-level responses "
+                       "(participants opt in) for reliability and item analysis.")
+            return
+        store = get_class_store()
+        code  = st.session_state.get("fac_cohort")
+        scope = st.segmented_control("Respondents", ["All cohorts", "This cohort"], default="All cohorts",
+                                     key="fac_item_scope", label_visibility="collapsed")
+        with span("instrument_stats"):
+            res = instrument_stats(code if scope == "This cohort" else None, store.version, BANK.digest)
+        st.metric(f"Respondents with item-level data (scenario bank v{BANK.version})", f"{res['n']:,}")
+        if QUIZ_ADAPTIVE:
+            st.caption("Complete responses only: short-form sessions that skipped scenarios are left out.")
+        if res["n"] < 2:
+            st.caption("Item statistics need at least two complete responses.")
+            return
+        names = [f"{DIMENSIONS[k]['icon']} {DIMENSIONS[k]['name']}" for k in DIM_KEYS]
+        st.markdown("#### Reliability (Cronbach's α)")
+        st.dataframe(pd.DataFrame({"Dimension": names, "Items": np.bincount(BANK.sc_dim, minlength=len(DIM_KEYS)),
+                                   "α": res["alpha"]}),
+                     use_container_width=True, hide_index=True,
+                     column_config={"α": st.column_config.NumberColumn(format="%.2f")})
+        st.markdown("#### Items")
+        opts  = res["options"]
+        items = pd.DataFrame({
+            "Scenario":      [sc["title"] for sc in BANK.scenarios],
+            "Dimension":     [names[d] for d in BANK.sc_dim],
+            "Item–total r":  res["item_total"],
+            **{f"Option {j + 1}": opts[:, j] * 100 for j in range(opts.shape[1])},
+            "Scores":        ["·".join(map(str, row)) for row in BANK.option_scores.tolist()],
+        })
+        st.dataframe(items, use_container_width=True, hide_index=True,
+                     column_config={"Item–total r": st.column_config.NumberColumn(format="%.2f"),
+                                    **{f"Option {j + 1}": st.column_config.NumberColumn(format="%.0f%%")
+                                       for j in range(opts.shape[1])}})
+        st.caption("Item–total r correlates each scenario with the rest of its dimension; values "
+                   "below about 0.2 mark scenarios that do not track the others. Option columns are "
+                   "the share choosing each option, in authored order; Scores lists their scores.")
+        st.markdown("#### Dimension correlations")
+        st.dataframe(pd.DataFrame(res["dim_corr"], index=names, columns=names),
+                     use_container_width=True,
+                     column_config={n: st.column_config.NumberColumn(format="%.2f") for n in names})
+
+# ─────────────────────────────────────────────────────────────────────────────
+# FACILITATOR DIAGNOSTICS
+# Timings from the PROFILING section, an optional tracemalloc view, and the
+# same numbers as a Prometheus text file.
+# ─────────────────────────────────────────────────────────────────────────────
+def diagnostics_panel():
+    import pandas as pd
+    with st.expander("🩺 Diagnostics"):
+        if not PROFILING:
+            st.caption("Set `PROFILING = true` in secrets to time page functions and helpers.")
+            return
+        prof = get_profiler()
+        rows = prof.summary()
+        if rows:
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True,
+                         column_config={c: st.column_config.NumberColumn(format="%.2f")
+                                        for c in ("total_s", "mean_ms", "p50_ms", "p95_ms", "max_ms")})
+            st.caption(f"mean / p50 / p95 / max over the last {Profiler.WINDOW} calls per section")
+        else:
+            st.caption("No timings recorded yet.")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("⬇ Prometheus metrics", data=prof.prometheus,
+                               file_name="bc_metrics.prom", mime="text/plain")
+        with col2:
+            st.button("Reset timings", on_click=prof.clear)
+        if not tracemalloc.is_tracing():
+            st.caption("Set `PROFILE_TRACEMALLOC = true` to track Python allocations (slows every allocation).")
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        st.caption(f"Traced memory: {current / 2**20:.1f} MB now · {peak / 2**20:.1f} MB peak")
+        if st.button("📸 Memory snapshot"):
+            st.dataframe(pd.DataFrame(prof.memory_snapshot()), use_container_width=True, hide_index=True,
+                         column_config={c: st.column_config.NumberColumn(format="%.1f")
+                                        for c in ("size_kb", "change_kb")})
+
 # ─────────────────────────────────────────────────────────────────────────────
 # WELCOME
 # ─────────────────────────────────────────────────────────────────────────────
+@timed("show_welcome")
 def show_welcome():
     st.markdown("""
     <div class="hero">
@@ -911,12 +2004,12 @@ The diagnostic is most useful when it's honest.
                               value=st.session_state.class_code,
                               placeholder="e.g. MBX-APR2026", label_visibility="visible")
 
-    st.markdown("""
+    st.markdown(f"""
     <div style="display:flex;gap:0.75rem;margin:1rem 0;flex-wrap:wrap">
       <div style="background:white;border-radius:10px;padding:0.7rem 1rem;flex:1;min-width:100px;
                   box-shadow:0 1px 4px rgba(0,0,0,0.07);text-align:center;border:1px solid #E2E8F0">
         <div style="font-size:1.3rem;margin-bottom:2px">📋</div>
-        <div style="font-size:0.75rem;font-weight:600;color:#475569">20 scenarios</div>
+        <div style="font-size:0.75rem;font-weight:600;color:#475569">{len(BANK.scenarios)} scenarios</div>
       </div>
       <div style="background:white;border-radius:10px;padding:0.7rem 1rem;flex:1;min-width:100px;
                   box-shadow:0 1px 4px rgba(0,0,0,0.07);text-align:center;border:1px solid #E2E8F0">
@@ -941,36 +2034,68 @@ The diagnostic is most useful when it's honest.
         else:
             st.session_state.name       = name_val.strip()
             st.session_state.class_code = code_val.strip()
-            order = list(range(len(SCENARIOS)))
-            random.shuffle(order)
-            # Shuffle option display order per scenario (keeps scoring correct)
-            opt_orders = {}
-            for sc in SCENARIOS:
-                idx_list = list(range(len(sc["options"])))
-                random.shuffle(idx_list)
-                opt_orders[sc["id"]] = idx_list
-            st.session_state.order      = order
-            st.session_state.opt_orders = opt_orders
-            st.session_state.answers    = {}
+            st.session_state.seed       = random.getrandbits(32)
+            st.session_state.bank       = BANK.digest   # pinned for the rest of this attempt
+            st.session_state.layout     = BANK.layout
+            st.session_state.answers    = BANK.new_answers()
             st.session_state.q_idx      = 0
             st.session_state.page       = "quiz"
+            start_resumable()
             st.rerun()
 
 # ─────────────────────────────────────────────────────────────────────────────
 # QUIZ
+# A fragment: choosing an option or moving Back/Next reruns only the scenario
+# card, not the CSS, sidebar or the rest of the page. Navigation happens in
+# button callbacks, which run before the fragment repaints.
+# With QUIZ_ADAPTIVE = true, Back/Next walk adaptive_flow() instead of every
+# position, so scenarios of a dimension whose tier is settled are skipped.
 # ─────────────────────────────────────────────────────────────────────────────
+QUIZ_ADAPTIVE = _flag("QUIZ_ADAPTIVE")
+
+def quiz_flow(bank, order, answers) -> list:
+    """Positions in *order* the participant will be shown."""
+    return bank.adaptive_flow(order, answers) if QUIZ_ADAPTIVE else list(range(len(order)))
+
+def _quiz_step(sid, display_opts, display_scrs, step):
+    if "answers" not in st.session_state and not restore_session():
+        return   # state evicted while idle and not resumable; the fragment sends them to the welcome page
+    touch_session()
+    bank   = session_bank()
+    choice = st.session_state[f"q_{sid}"]
+    st.session_state.answers[bank.scenario_index[sid]] = display_scrs[display_opts.index(choice)]
+    idx  = st.session_state.q_idx
+    flow = quiz_flow(bank, bank.shuffle_plan(st.session_state.seed)[0], st.session_state.answers)
+    if step > 0:
+        nxt = [p for p in flow if p > idx]
+        if nxt:
+            st.session_state.q_idx = nxt[0]
+        else:
+            st.session_state.page = "results"
+    else:
+        st.session_state.q_idx = max([p for p in flow if p < idx], default=idx)
+    checkpoint()
+
+@st.fragment
+@timed("show_quiz")
 def show_quiz():
+    if st.session_state.get("page") != "quiz":
+        st.rerun()   # last answer given (or state evicted) — leave the fragment for a full page run
+    bank  = session_bank()
     idx   = st.session_state.q_idx
-    total = len(SCENARIOS)
-    sc    = SCENARIOS[st.session_state.order[idx]]
-    dim   = DIMENSIONS[sc["dim"]]
-    level = LEVEL_LABELS[sc["level"]]
+    order, opt_orders = bank.shuffle_plan(st.session_state.seed)
+    flow  = quiz_flow(bank, order, st.session_state.answers)
+    step  = sum(p < idx for p in flow)
+    total = len(flow) + (idx not in flow)
+    sc    = bank.scenarios[order[idx]]
+    dim   = bank.dimensions[sc["dim"]]
+    level = bank.level_labels[sc["level"]]
 
-    pct = idx / total
+    pct = step / total
     st.markdown(f"""
     <div class="prog-wrap">
       <div class="prog-label">
-        <span>Scenario {idx+1} of {total}</span>
+        <span>Scenario {step+1} of {total}</span>
         <span style="color:{dim['color']};font-weight:600">{dim['icon']} {dim['name']}</span>
       </div>
       <div class="prog-bg"><div class="prog-fill" style="width:{pct*100:.0f}%"></div></div>
@@ -985,37 +2110,164 @@ def show_quiz():
     </div>""", unsafe_allow_html=True)
 
     # Shuffled option display
-    opt_order   = st.session_state.opt_orders.get(sc["id"], list(range(len(sc["options"]))))
+    opt_order    = opt_orders[order[idx]]
     display_opts = [sc["options"][i][0] for i in opt_order]
     display_scrs = [sc["options"][i][1] for i in opt_order]
 
-    prev_score  = st.session_state.answers.get(sc["id"])
+    prev_score  = st.session_state.answers[order[idx]]
     default_idx = display_scrs.index(prev_score) if prev_score in display_scrs else 0
 
     choice = st.radio("", display_opts, index=default_idx, key=f"q_{sc['id']}")
-    chosen_score = display_scrs[display_opts.index(choice)]
 
-    is_last = idx == total - 1
+    # Would the current choice end the quiz? (Adaptive mode can settle the last open dimension.)
+    answers = bytearray(st.session_state.answers)
+    answers[order[idx]] = display_scrs[display_opts.index(choice)]
+    is_last = not any(p > idx for p in quiz_flow(bank, order, answers))
+    args    = (sc["id"], display_opts, display_scrs)
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("← Back", disabled=(idx == 0)):
-            st.session_state.answers[sc["id"]] = chosen_score
-            st.session_state.q_idx -= 1
-            st.rerun()
+        st.button("← Back", disabled=(idx == 0), on_click=_quiz_step, args=args + (-1,))
     with col2:
-        if st.button("See My Results →" if is_last else "Next →"):
-            st.session_state.answers[sc["id"]] = chosen_score
-            if is_last:
-                st.session_state.page = "results"
-            else:
-                st.session_state.q_idx += 1
-            st.rerun()
+        st.button("See My Results →" if is_last else "Next →", on_click=_quiz_step, args=args + (1,))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# QUIZ — CLIENT-SIDE MODE (QUIZ_MODE = "client")
+# All 20 shuffled scenarios ship to the browser in one render; navigation
+# happens there and the full answer set comes back in one message. Option
+# scores never leave the server: the component returns display positions,
+# which are mapped back through the seed's option orders and the bank's option scores.
+# ─────────────────────────────────────────────────────────────────────────────
+_quiz_component = components.declare_component(
+    "bc_quiz", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_component"))
+
+@timed("show_quiz_client")
+def show_quiz_client():
+    bank = session_bank()
+    seed = st.session_state.seed
+    order, opt_orders = bank.shuffle_plan(seed)
+    payload = []
+    for i in order:
+        sc  = bank.scenarios[i]
+        dim = bank.dimensions[sc["dim"]]
+        payload.append({
+            "id": sc["id"], "title": sc["title"], "context": sc["context"], "prompt": sc["prompt"],
+            "level": bank.level_labels[sc["level"]],
+            "dim_name": dim["name"], "dim_icon": dim["icon"], "dim_color": dim["color"],
+            "options": [sc["options"][j][0] for j in opt_orders[i]],
+        })
+    result = _quiz_component(scenarios=payload, key=f"quiz_client_{seed}", default=None)
+    posted = result.get("answers") if isinstance(result, dict) else None
+    if not isinstance(posted, dict):
+        return
+    answers = bank.new_answers()
+    for sid, pos in posted.items():   # browser input: skip anything that isn't a valid position
+        i = bank.scenario_index.get(sid)
+        if i is None or type(pos) is not int or not 0 <= pos < len(opt_orders[i]):
+            continue
+        answers[i] = bank.option_scores[i, opt_orders[i][pos]]
+    if all(answers):
+        st.session_state.answers = answers
+        st.session_state.page    = "results"
+        checkpoint()
+        st.rerun()
 
 # ─────────────────────────────────────────────────────────────────────────────
 # RESULTS
 # ─────────────────────────────────────────────────────────────────────────────
+def submit_confirmation(key, polling=False):
+    ingest = get_submission_ingest()
+    state  = ingest.status(key)
+    ticket = ingest.sheets_ticket(key)
+    sheets = get_sheets_delivery().status(ticket)
+    title  = {
+        "queued":    "⏳ Submitting to Class Dashboard…",
+        "replaced":  "✅ Submitted to Class Dashboard — replacing your earlier submission",
+    }.get(state, "✅ Submitted to Class Dashboard")
+    extra  = "" if state == "queued" else {
+        "queued":    "saving to the research dataset…",
+        "delivered": "and saved to the research dataset ✓",
+        "failed":    "(could not reach the research dataset — your class submission is safe)",
+        "disabled":  "" if _secret("GOOGLE_SHEET_URL", "") else
+                     "(configure Google Sheets to save to research dataset)",
+        "expired":   "",
+    }[sheets]
+    st.markdown(f"""
+    <div class="confirm-box">
+      <h3>{title}</h3>
+      <p>{extra}</p>
+    </div>""", unsafe_allow_html=True)
+    if polling and state != "queued" and sheets != "queued":
+        st.rerun()   # ingest and delivery settled — full rerun drops the polling fragment
+
+def _submit(name, scores):
+    # One key per attempt: the resume token is reissued on Retake.
+    token = st.session_state.get("resume") or secrets.token_urlsafe(8)
+    key   = content_digest(f"submit:{token}".encode())
+    row   = {
+        "timestamp":      datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "name":           name,
+        "class_code":     st.session_state.class_code,
+        "awareness":      scores["awareness"],
+        "coordination":   scores["coordination"],
+        "reflection":     scores["reflection"],
+        "transformation": scores["transformation"],
+        "submission_id":  key,   # last, so sheets set up before it only gain a column at the end
+    }
+    rec   = {"name": name, "class_code": st.session_state.class_code,
+             "scores": scores, "timestamp": datetime.now().strftime("%H:%M"),
+             "skipped": st.session_state.answers.count(0), "bank": session_bank().digest}
+    if ITEM_LOG and st.session_state.get("share_items"):
+        rec["items"] = bytes(st.session_state.answers)
+    status = get_submission_ingest().submit(key, rec, row, _secret("GOOGLE_SHEET_URL", ""))
+    st.session_state.submission_key = key
+    st.session_state.submitted      = status != "busy"
+    if status == "busy":
+        st.session_state.submit_retry = "The class dashboard is busy right now — please submit again in a moment."
+    checkpoint()
+
+@st.fragment
+def submit_panel(name, scores):
+    """Submit card and ingest/delivery status; reruns on its own when Submit is clicked."""
+    if "submitted" not in st.session_state:
+        st.rerun()   # state evicted while idle
+    if not st.session_state.submitted:
+        unless = " unless you tick the box below" if ITEM_LOG else ""
+        st.markdown(f"""
+        <div class="card">
+          <div style="font-weight:700;color:#1E293B;margin-bottom:0.4rem">📤 Submit to Class & Research Dataset</div>
+          <p style="margin:0;font-size:0.87rem;color:#475569;line-height:1.65">
+            Share your dimension scores with the facilitator's live dashboard and the research dataset.
+            Only your name and four dimension scores are submitted —
+            your individual scenario responses remain private{unless}.
+          </p>
+        </div>""", unsafe_allow_html=True)
+        if ITEM_LOG:
+            st.checkbox("Also share my individual scenario choices to help improve the diagnostic",
+                        key="share_items",
+                        help="They are stored with your submission until the facilitator clears the class "
+                             "results, then kept without your name (small classes are pooled). They add up "
+                             "to your submitted scores, so they are not anonymous.")
+        if "submit_retry" in st.session_state:
+            st.warning(st.session_state.pop("submit_retry"))
+        st.button("✅ Submit to Class", on_click=_submit, args=(name, scores))
+    else:
+        key    = st.session_state.get("submission_key")
+        ingest = get_submission_ingest()
+        if ingest.status(key) == "failed":
+            st.session_state.submitted    = False
+            st.session_state.submit_retry = "Your submission could not be saved — please submit again."
+            st.rerun()
+        if ingest.status(key) == "queued" or get_sheets_delivery().status(ingest.sheets_ticket(key)) == "queued":
+            st.fragment(run_every=1)(submit_confirmation)(key, polling=True)
+        else:
+            submit_confirmation(key)
+
+@timed("show_results")
 def show_results():
-    scores = compute_scores(st.session_state.answers)
+    bank   = session_bank()
+    vec    = bank.impute_skipped(bank.answer_vector(st.session_state.answers))
+    with span("compute_scores"):
+        scores = bank.compute_scores(vec)
     name   = st.session_state.name
 
     st.markdown(f"""
@@ -1025,31 +2277,31 @@ def show_results():
       <p style="margin:6px 0 0;font-size:0.88rem">{name}</p>
     </div>""", unsafe_allow_html=True)
 
+    figs = get_figure_cache()
     col1, col2 = st.columns(2)
     with col1:
-        st.plotly_chart(make_radar([scores],[name]), use_container_width=True)
+        st.plotly_chart(figs.get("radar", scores, bank), use_container_width=True)
     with col2:
-        st.plotly_chart(make_bar(scores), use_container_width=True)
+        st.plotly_chart(figs.get("bar", scores, bank), use_container_width=True)
 
     # Level breakdown per dimension
-    level_scores = {}
-    for sc in SCENARIOS:
-        level_scores[(sc["dim"], sc["level"])] = st.session_state.answers.get(sc["id"], 0)
+    level_scores = bank.level_breakdown(vec)
 
     st.markdown("<h3 style='font-family:Lora,Georgia,serif;color:#1E293B;margin-bottom:0.75rem'>"
                 "Dimension Profiles</h3>", unsafe_allow_html=True)
 
-    for key, dim in DIMENSIONS.items():
+    for key, dim in bank.dimensions.items():
         s               = scores[key]
         label, lc, tidx = score_tier(s)
         pct             = (s/20)*100
 
-        dim_levels = [(lv, level_scores.get((key, lv), 0)) for lv in LEVEL_LABELS]
+        d = DIM_KEYS.index(key)
+        dim_levels = list(zip(bank.level_keys, level_scores[d].tolist(), bank.level_max[d].tolist()))
         sorted_lvls = sorted(dim_levels, key=lambda x: x[1], reverse=True)
         pill_html = "<div class='level-pills'>"
-        for i, (lv, lv_score) in enumerate(sorted_lvls):
+        for i, (lv, lv_score, lv_max) in enumerate(sorted_lvls):
             cls = "pill best" if i == 0 else ("pill low" if i == len(sorted_lvls)-1 else "pill")
-            pill_html += f"<span class='{cls}'>{LEVEL_LABELS[lv]} {lv_score}/4</span>"
+            pill_html += f"<span class='{cls}'>{bank.level_labels[lv]} {lv_score}/{lv_max}</span>"
         pill_html += "</div>"
 
         st.markdown(f"""
@@ -1079,7 +2331,7 @@ def show_results():
 
     st.markdown("---")
 
-    report = html_report(name, scores, st.session_state.class_code)
+    report = html_report(name, scores, st.session_state.class_code, bank.dimensions)
     st.download_button("📄 Download My Report (open → Print → Save as PDF)",
                        data=report,
                        file_name=f"BC_Diagnostic_{name.replace(' ','_')}.html",
@@ -1087,45 +2339,12 @@ def show_results():
 
     st.markdown("<div style='height:0.4rem'></div>", unsafe_allow_html=True)
 
-    if not st.session_state.submitted:
-        st.markdown("""
-        <div class="card">
-          <div style="font-weight:700;color:#1E293B;margin-bottom:0.4rem">📤 Submit to Class & Research Dataset</div>
-          <p style="margin:0;font-size:0.87rem;color:#475569;line-height:1.65">
-            Share your dimension scores with the facilitator's live dashboard and the research dataset.
-            Only your name and four dimension scores are submitted —
-            your individual scenario responses remain private.
-          </p>
-        </div>""", unsafe_allow_html=True)
-        if st.button("✅ Submit to Class"):
-            store = get_class_store()
-            row   = {
-                "timestamp":      datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "name":           name,
-                "class_code":     st.session_state.class_code,
-                "awareness":      scores["awareness"],
-                "coordination":   scores["coordination"],
-                "reflection":     scores["reflection"],
-                "transformation": scores["transformation"],
-            }
-            store.append({"name": name, "class_code": st.session_state.class_code,
-                          "scores": scores, "timestamp": datetime.now().strftime("%H:%M")})
-            ok = submit_to_sheets(row)
-            st.session_state.submitted = True
-            st.session_state.sheets_ok = ok
-            st.rerun()
-    else:
-        ok    = st.session_state.get("sheets_ok", False)
-        extra = "and saved to the research dataset ✓" if ok else "(configure Google Sheets to save to research dataset)"
-        st.markdown(f"""
-        <div class="confirm-box">
-          <h3>✅ Submitted to Class Dashboard</h3>
-          <p>{extra}</p>
-        </div>""", unsafe_allow_html=True)
+    submit_panel(name, scores)
 
     st.markdown("<div style='height:0.4rem'></div>", unsafe_allow_html=True)
     if st.button("🔄 Retake Diagnostic"):
-        for k in ["page","q_idx","order","opt_orders","answers","submitted","sheets_ok"]:
+        end_resumable()
+        for k in ["page","q_idx","seed","bank","layout","answers","submitted","submission_key"]:
             st.session_state.pop(k, None)
         st.rerun()
 
@@ -1136,14 +2355,23 @@ def show_results():
 # ─────────────────────────────────────────────────────────────────────────────
 # MAIN
 # ─────────────────────────────────────────────────────────────────────────────
+@timed("rerun")
 def main():
     apply_css()
     init_state()
     facilitator_sidebar()
-    if   st.session_state.fac_mode:         show_facilitator()
+    if   st.session_state.fac_mode:
+        show_facilitator()
+        comparison_panel()
+        instrument_panel()
+        diagnostics_panel()
     elif st.session_state.page == "welcome": show_welcome()
-    elif st.session_state.page == "quiz":    show_quiz()
+    elif st.session_state.page == "quiz":
+        if _secret("QUIZ_MODE", "server") == "client": show_quiz_client()
+        else:                                         show_quiz()
     elif st.session_state.page == "results": show_results()
+    if PROFILING and _secret("PROFILE_PROM_FILE"):
+        get_profiler().export(_secret("PROFILE_PROM_FILE"))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,317 @@
+"""
+Offline batch scoring for the Boundary Crossing Diagnostic.
+
+Scores raw scenario answers collected outside the app — paper forms keyed
+into a spreadsheet, LMS quiz exports — with the same scenario bank and
+scoring as the app, so nobody re-keys answers into the quiz by hand.
+
+    python batchscore.py answers.csv scored.csv
+    python batchscore.py lms.jsonl scored.jsonl --answers score --reports reports/
+    python batchscore.py paper.csv scored.csv --bank bank/scenarios-v2.json --workers 8
+
+Input is CSV (with a header row) or JSON Lines, one respondent per row,
+with a column per scenario id (A1 … T5) holding the chosen option: its
+letter (A, B, …) or 1-based position in the bank's authored order, or its
+score, per --answers. Every other column (name, class_code, a student id…)
+is copied through; from JSON Lines that is every key any object has,
+null where an object lacks it. Each output row adds the four dimension scores and
+tiers, or an `error` naming the unanswered or unreadable scenarios — or,
+for a JSON Lines line that isn't a JSON object, the line and what's wrong.
+--reports also writes each scored respondent's printable HTML report.
+Exit status is 1 when no row could be scored at all.
+
+Rows are read and written a chunk at a time and scored on a pool of worker
+processes with at most two chunks per worker in flight, so memory stays
+flat however long the file is. Progress goes to stderr.
+"""
+
+import argparse
+import collections
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from diagnostic import BANK, BankError, compile_bank, html_report, score_tier
+
+CHUNK   = 5000
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+ANSWERS = ("letter", "position", "score")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WORKER
+# Each pool process compiles the bank once in its initializer; chunks then
+# arrive as (header, rows) and leave as finished output text.
+# ─────────────────────────────────────────────────────────────────────────────
+_job = {}
+
+def _init(bank_path, answers, out_format, reports):
+    bank = BANK
+    if bank_path:
+        with open(bank_path, "rb") as f:
+            bank = compile_bank(f.read(), os.path.basename(bank_path))
+    tiers = [[score_tier(s, m)[0] for s in range(int(m) + 1)] for m in bank.dim_max]
+    if answers == "letter":
+        codes = {chr(ord("A") + i): i + 1 for i in range(26)}
+    else:
+        codes = {str(i): i for i in range(1, 128)}
+    codes[""] = 0
+    _job.update(bank=bank, answers=answers, out_format=out_format, reports=reports,
+                tiers=tiers, codes=codes)
+
+
+def _codes(cells) -> np.ndarray:
+    """One scenario's raw cells -> option letter/position/score as int; 0 blank, -1 unreadable."""
+    codes = _job["codes"]
+    return np.fromiter((codes.get(str(c).strip().upper() if c is not None else "", -1) for c in cells),
+                       dtype=np.intp, count=len(cells))
+
+
+def score_chunk(start: int, header: list, rows: list, problems=None) -> tuple:
+    """(output text, rows scored, rows with errors) for *rows*, numbered from *start*.
+
+    *problems* maps a row's index in the chunk to why it couldn't be read;
+    those rows are written as errors without scoring.
+    """
+    bank, answers = _job["bank"], _job["answers"]
+    cols  = {h: i for i, h in enumerate(header)}
+    keep  = [i for i, h in enumerate(header) if h not in bank.scenario_index]
+    n_sc  = len(bank.scenarios)
+    raw   = np.zeros((len(rows), n_sc), dtype=np.intp)
+    for j, sc in enumerate(bank.scenarios):
+        i = cols.get(sc["id"])
+        if i is not None:
+            raw[:, j] = _codes([row[i] if i < len(row) else None for row in rows])
+
+    if answers == "score":
+        valid = (raw[:, :, None] == bank.option_scores[None, :, :]).any(axis=2)
+        vec   = np.where(valid, raw, 0)
+    else:
+        n_opt = bank.option_scores.shape[1]
+        valid = (raw >= 1) & (raw <= n_opt)
+        vec   = np.where(valid, bank.option_scores[np.arange(n_sc), np.clip(raw - 1, 0, n_opt - 1)], 0)
+    totals = bank.score_batch(vec)
+    ok     = valid.all(axis=1)
+    problems = problems or {}
+    ok[list(problems)] = False
+
+    out, reports = io.StringIO(), _job["reports"]
+    writer = csv.writer(out) if _job["out_format"] == "csv" else None
+    dims   = bank.dim_keys
+    for r, row in enumerate(rows):
+        passed = [row[i] if i < len(row) else "" for i in keep]
+        if ok[r]:
+            scores = dict(zip(dims, totals[r].tolist()))
+            tiers  = [_job["tiers"][d][scores[k]] for d, k in enumerate(dims)]
+            error  = None
+            if reports:
+                _write_report(reports, start + r, header, row, scores, bank)
+        else:
+            scores, tiers = dict.fromkeys(dims, None), [None] * len(dims)
+            error  = problems.get(r) or _describe(raw[r], valid[r], bank, cols)
+        if writer:
+            writer.writerow(passed + list(scores.values()) + tiers + [error or ""])
+        else:
+            rec = dict(zip((header[i] for i in keep), passed))
+            rec.update(scores)
+            rec.update(zip((f"{k}_tier" for k in dims), tiers))
+            rec["error"] = error
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return out.getvalue(), int(ok.sum()), int(len(rows) - ok.sum())
+
+
+def _describe(raw_row, valid_row, bank, cols) -> str:
+    missing = [sc["id"] for j, sc in enumerate(bank.scenarios) if not valid_row[j] and
+               (sc["id"] not in cols or raw_row[j] == 0)]
+    bad     = [sc["id"] for j, sc in enumerate(bank.scenarios) if not valid_row[j] and
+               sc["id"] in cols and raw_row[j] != 0]
+    parts   = ([f"unanswered: {', '.join(missing)}"] if missing else []) + \
+              ([f"not an option: {', '.join(bad)}"] if bad else [])
+    return "; ".join(parts)
+
+
+def _write_report(directory, number, header, row, scores, bank):
+    cell = lambda h: str(row[header.index(h)]) if h in header and header.index(h) < len(row) else ""
+    name = cell("name") or f"Respondent {number}"
+    safe = re.sub(r"[^\w\-]+", "_", name).strip("_") or "participant"
+    with open(os.path.join(directory, f"{number:06d}_BC_Diagnostic_{safe}.html"), "w", encoding="utf-8") as f:
+        f.write(html_report(name, scores, cell("class_code"), bank.dimensions))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# READ / WRITE
+# ─────────────────────────────────────────────────────────────────────────────
+def _format(path, given, flag):
+    fmt = given or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise SystemExit(f"{path}: can't tell the format from the extension; pass {flag} csv|jsonl")
+    return fmt
+
+
+def _objects(f):
+    """(object, problem) per non-blank line; a malformed line is ({}, what was wrong with it)."""
+    for number, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {}, f"line {number}: not valid JSON ({e.msg})"
+                continue
+            if not isinstance(obj, dict):
+                yield {}, f"line {number}: expected a JSON object, got {type(obj).__name__}"
+                continue
+            yield obj, None
+
+
+def passthrough_keys(f, ids) -> list:
+    """Every non-scenario key in a JSON Lines file, in order of first appearance; rewinds *f*."""
+    keys = {}
+    for obj, _ in _objects(f):
+        keys.update((k, None) for k in obj if k not in ids)
+    f.seek(0)
+    return list(keys)
+
+
+def read_chunks(f, fmt: str, size: int, ids=(), extra=None):
+    """(header, chunk of rows as lists, {row in chunk: problem}) from an open text file.
+
+    JSON Lines rows are built from the scenario *ids* plus the pass-through
+    keys: *extra* when given (a fixed column set, for CSV output), else the
+    union of the keys of the objects in that chunk. A line that isn't a JSON
+    object comes through as an empty row with its problem, to be written as
+    an error row rather than stopping the run.
+    """
+    if fmt == "csv":
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [h.strip() for h in header]
+        while True:
+            chunk = list(itertools.islice(reader, size))
+            if not chunk:
+                return
+            yield header, chunk, {}
+    ids, objects = list(ids), _objects(f)
+    while True:
+        batch = list(itertools.islice(objects, size))
+        if not batch:
+            return
+        keys = extra
+        if keys is None:
+            keys = list({k: None for obj, _ in batch for k in obj if k not in ids})
+        header = ids + keys
+        yield (header, [[obj.get(h) for h in header] for obj, _ in batch],
+               {r: problem for r, (_, problem) in enumerate(batch) if problem})
+
+
+def output_header(header: list, bank, fmt: str) -> str:
+    if fmt != "csv":
+        return ""
+    keep = [h for h in header if h not in bank.scenario_index]
+    out  = io.StringIO()
+    csv.writer(out).writerow(keep + bank.dim_keys + [f"{k}_tier" for k in bank.dim_keys] + ["error"])
+    return out.getvalue()
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RUN
+# ─────────────────────────────────────────────────────────────────────────────
+class Progress:
+    EVERY = 1.0   # seconds between updates
+
+    def __init__(self, total_bytes, position):
+        self._total, self._position = total_bytes, position
+        self._t0 = self._last = time.perf_counter()
+        self._end = "\r" if sys.stderr.isatty() else "\n"
+        self.rows = self.errors = 0
+
+    def add(self, ok: int, bad: int, final: bool = False):
+        self.rows  += ok + bad
+        self.errors += bad
+        now = time.perf_counter()
+        if not final and now - self._last < self.EVERY:
+            return
+        self._last = now
+        rate = self.rows / max(now - self._t0, 1e-9)
+        pct  = f" · {min(100 * self._position() / self._total, 100):.0f}%" if self._total else ""
+        print(f"{self.rows:>10,} rows · {self.errors:,} with errors · {rate:,.0f} rows/s{pct}",
+              end="\n" if final else self._end, file=sys.stderr, flush=True)
+
+
+def run(args) -> Progress:
+    in_fmt  = _format(args.input, args.format, "--format")
+    out_fmt = _format(args.output, args.output_format, "--output-format")
+    initargs = (args.bank, args.answers, out_fmt, args.reports)
+    _init(*initargs)   # validates the bank up front and serves --workers 1
+    bank = _job["bank"]
+    if args.reports:
+        os.makedirs(args.reports, exist_ok=True)
+
+    workers = max(1, args.workers)
+    pool    = None if workers == 1 else ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init, initargs=initargs)
+    with open(args.input, encoding="utf-8-sig", newline="") as src, \
+         open(args.output, "w", encoding="utf-8", newline="") as dst:
+        progress = Progress(os.fstat(src.fileno()).st_size, src.buffer.tell)
+        pending, start, header_done = collections.deque(), 1, False
+
+        def drain(n):
+            while len(pending) > n:
+                text, ok, bad = pending.popleft().result() if pool else pending.popleft()
+                dst.write(text)
+                progress.add(ok, bad)
+
+        ids   = list(bank.scenario_index)
+        extra = passthrough_keys(src, ids) if in_fmt == "jsonl" and out_fmt == "csv" else None
+        for header, rows, problems in read_chunks(src, in_fmt, args.chunk, ids, extra):
+            if not header_done:
+                if not set(bank.scenario_index) & set(header):
+                    raise SystemExit(f"{args.input}: no scenario columns ({', '.join(bank.scenario_index)})")
+                dst.write(output_header(header, bank, out_fmt))
+                header_done = True
+            if pool:
+                pending.append(pool.submit(score_chunk, start, header, rows, problems))
+            else:
+                pending.append(score_chunk(start, header, rows, problems))
+            start += len(rows)
+            drain(2 * workers - 1)
+        drain(0)
+        progress.add(0, 0, final=True)
+    if pool:
+        pool.shutdown()
+    return progress
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("input", help="CSV or JSON Lines file of raw answers")
+    ap.add_argument("output", help="where to write the scored rows (.csv or .jsonl)")
+    ap.add_argument("--answers", choices=ANSWERS, default="letter",
+                    help="what the scenario columns hold: option letter or 1-based position in the "
+                         "bank's authored order, or the option's score (default: %(default)s)")
+    ap.add_argument("--bank", metavar="FILE", help=f"scenario bank file (default: bank v{BANK.version})")
+    ap.add_argument("--reports", metavar="DIR", help="also write an HTML report per scored respondent")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="scoring processes; 1 scores in this process (default: %(default)s)")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="rows per chunk (default: %(default)s)")
+    ap.add_argument("--format", choices=sorted(set(FORMATS.values())), help="input format if not by extension")
+    ap.add_argument("--output-format", choices=sorted(set(FORMATS.values())),
+                    help="output format if not by extension")
+    args = ap.parse_args()
+    try:
+        progress = run(args)
+    except (BankError, OSError, ValueError) as e:
+        raise SystemExit(f"batchscore: {e}") from None
+    sys.exit(1 if progress.errors and progress.errors == progress.rows else 0)   # likely the wrong --answers
+
+
+if __name__ == "__main__":
+    main()
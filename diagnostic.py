@@ -0,0 +1,461 @@
+"""
+MBX Boundary Crossing Diagnostic — content, scoring and reports.
+
+Everything here is plain Python (no Streamlit), so it can be imported by
+the app, by process-pool workers and by offline tools alike.
+"""
+
+import functools
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+from html import escape
+from datetime import datetime
+
+import numpy as np
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SCENARIO BANK
+# Dimensions, organisational levels and the SJT scenarios live in versioned
+# JSON files in bank/ (YAML too, when PyYAML is installed), so the wording
+# can change without a redeploy. A file is validated and compiled once into
+# a Bank — its content plus the flat arrays scoring runs on — and compiled
+# banks are kept by content hash: re-reading an unchanged file costs a hash,
+# and every version loaded in this process stays addressable, which is what
+# lets a session finish on the bank it started with.
+#
+# Scoring is one vectorised pass over a fixed-width answer vector (one slot
+# per scenario in bank order, 0 = unanswered). A session keeps the same
+# layout packed into a bytearray, and its scenario and option shuffles are
+# re-derived from one integer seed rather than stored.
+# ─────────────────────────────────────────────────────────────────────────────
+APP_DIR    = os.path.dirname(os.path.abspath(__file__))
+BANK_DIR   = os.path.join(APP_DIR, "bank")
+BANK_EXTS  = (".json", ".yaml", ".yml")
+TIER_COUNT = 4   # score_tier bands; each dimension needs one feedback text per band
+MAX_SCORE  = 20  # every dimension is reported out of 20
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+class BankError(ValueError):
+    """A bank file that does not parse or validate."""
+
+
+def _bank_problems(data) -> list:
+    if not isinstance(data, dict):
+        return ["top level must be a mapping"]
+    out = [f"missing '{k}'" for k in ("version", "dimensions", "levels", "scenarios") if not data.get(k)]
+    if out:
+        return out
+    dims, levels = data["dimensions"], data["levels"]
+    if not isinstance(data["version"], (str, int, float)):
+        out.append("'version' must be text or a number")
+    if not isinstance(dims, dict):
+        out.append("'dimensions' must be a mapping of key -> dimension")
+    if not (isinstance(levels, dict) and all(isinstance(k, str) and isinstance(v, str) for k, v in levels.items())):
+        out.append("'levels' must be a mapping of key -> label text")
+    if not isinstance(data["scenarios"], list):
+        out.append("'scenarios' must be a list")
+    if out:
+        return out
+    for key, dim in dims.items():
+        if not (isinstance(key, str) and isinstance(dim, dict)):
+            out.append(f"dimension {key}: must be a mapping under a text key")
+            continue
+        for field in ("name", "icon", "color", "tagline"):
+            if not isinstance(dim.get(field), str):
+                out.append(f"dimension {key}: '{field}' must be text")
+        fb = dim.get("feedback")
+        if not (isinstance(fb, list) and len(fb) == TIER_COUNT and all(isinstance(t, str) for t in fb)):
+            out.append(f"dimension {key}: 'feedback' must be {TIER_COUNT} texts, one per tier")
+    seen, n_opts, dim_max = set(), None, dict.fromkeys(dims, 0)
+    for i, sc in enumerate(data["scenarios"]):
+        sid = sc.get("id") if isinstance(sc, dict) else None
+        tag = f"scenario {sid or i + 1}"
+        if not isinstance(sid, str) or sid in seen:
+            out.append(f"{tag}: 'id' must be unique text")
+            continue
+        seen.add(sid)
+        dim = sc.get("dim") if isinstance(sc.get("dim"), str) else None
+        if dim not in dims:
+            out.append(f"{tag}: unknown dim {sc.get('dim')!r}")
+        if not isinstance(sc.get("level"), str) or sc["level"] not in levels:
+            out.append(f"{tag}: unknown level {sc.get('level')!r}")
+        for field in ("title", "context", "prompt"):
+            if not isinstance(sc.get(field), str):
+                out.append(f"{tag}: '{field}' must be text")
+        opts = sc.get("options")
+        if not (isinstance(opts, list) and 2 <= len(opts) <= 127 and
+                all(isinstance(o, (list, tuple)) and len(o) == 2 and isinstance(o[0], str)
+                    and isinstance(o[1], int) for o in opts)):
+            out.append(f"{tag}: 'options' must be [text, score] pairs")
+            continue
+        # Scores double as option ranks (packed answers, option frequencies, level pills).
+        if sorted(o[1] for o in opts) != list(range(1, len(opts) + 1)):
+            out.append(f"{tag}: option scores must be 1 … {len(opts)}, one each")
+        if n_opts not in (None, len(opts)):
+            out.append(f"{tag}: every scenario needs the same number of options")
+        n_opts = len(opts)
+        if dim in dim_max:
+            dim_max[dim] += max(o[1] for o in opts)
+    out += [f"dimension {k}: best answers must total {MAX_SCORE}, not {v}"
+            for k, v in dim_max.items() if v != MAX_SCORE]
+    return out
+
+
+class Bank:
+    """One compiled version of the scenario bank."""
+
+    def __init__(self, data: dict, digest: str):
+        self.version      = str(data["version"])
+        self.digest       = digest
+        self.dimensions   = data["dimensions"]
+        self.level_labels = data["levels"]
+        self.scenarios    = [dict(sc, options=[tuple(o) for o in sc["options"]]) for sc in data["scenarios"]]
+        self.dim_keys       = list(self.dimensions)
+        self.level_keys     = list(self.level_labels)
+        self.scenario_index = {sc["id"]: i for i, sc in enumerate(self.scenarios)}
+        self.sc_dim         = np.array([self.dim_keys.index(sc["dim"]) for sc in self.scenarios], dtype=np.intp)
+        self.sc_level       = np.array([self.level_keys.index(sc["level"]) for sc in self.scenarios], dtype=np.intp)
+        self.option_scores  = np.array([[s for _, s in sc["options"]] for sc in self.scenarios], dtype=np.int8)
+        self.dim_onehot     = np.eye(len(self.dim_keys), dtype=np.int32)[self.sc_dim]   # scenarios × dims
+        self.option_min     = self.option_scores.min(axis=1)
+        self.option_max     = self.option_scores.max(axis=1)
+        self.dim_max        = self.score_batch(self.option_max)
+        self.level_max      = self.level_breakdown(self.option_max)   # dims × levels best possible
+        self.shuffle_plan   = functools.lru_cache(maxsize=1024)(self._shuffle_plan)
+        # Banks with the same layout order scenarios and options identically, so saved answers carry over.
+        self.layout = content_digest(json.dumps([(sc["id"], len(sc["options"])) for sc in self.scenarios]).encode())
+
+    def __repr__(self):
+        return f"<Bank v{self.version} {self.digest}>"
+
+    def answer_vector(self, answers) -> np.ndarray:
+        """{scenario id: score} or packed answers (see new_answers) -> int8 vector aligned with scenarios."""
+        if isinstance(answers, (bytes, bytearray)):
+            return np.frombuffer(bytes(answers), dtype=np.int8)
+        vec = np.zeros(len(self.scenarios), dtype=np.int8)
+        for sid, val in answers.items():
+            i = self.scenario_index.get(sid)
+            if i is not None and val is not None:
+                vec[i] = val
+        return vec
+
+    def compute_scores(self, answers) -> dict:
+        vec = answers if isinstance(answers, np.ndarray) else self.answer_vector(answers)
+        return dict(zip(self.dim_keys, (vec.astype(np.int32) @ self.dim_onehot).tolist()))
+
+    def score_batch(self, matrix) -> np.ndarray:
+        """Score many answer vectors at once: (n, scenarios) -> (n, dims) in dim_keys order."""
+        return np.asarray(matrix, dtype=np.int32) @ self.dim_onehot
+
+    def level_breakdown(self, answers) -> np.ndarray:
+        """dims × levels grid of answer scores, in dim_keys / level_keys order."""
+        vec  = answers if isinstance(answers, np.ndarray) else self.answer_vector(answers)
+        grid = np.zeros((len(self.dim_keys), len(self.level_keys)), dtype=np.int32)
+        np.add.at(grid, (self.sc_dim, self.sc_level), vec)
+        return grid
+
+    def new_answers(self) -> bytearray:
+        """Packed answers: one byte per scenario in bank order holding its score, 0 = unanswered."""
+        return bytearray(len(self.scenarios))
+
+    def _shuffle_plan(self, seed: int) -> tuple:
+        """(scenario order, option orders) for a participant's *seed*; option orders follow bank order."""
+        rng   = random.Random(seed)
+        order = list(range(len(self.scenarios)))
+        rng.shuffle(order)
+        opt_orders = []
+        for sc in self.scenarios:
+            idx = list(range(len(sc["options"])))
+            rng.shuffle(idx)
+            opt_orders.append(tuple(idx))
+        return tuple(order), tuple(opt_orders)
+
+    # Adaptive short form: a dimension is settled once every way of answering
+    # its remaining scenarios lands in the same score_tier; those scenarios
+    # are then skipped and, for scoring, filled with the respondent's own mean
+    # answer in that dimension — which by construction cannot move the tier.
+    def settled_dims(self, answers) -> np.ndarray:
+        """Per dimension: True when it has unanswered scenarios that cannot change its tier."""
+        vec   = answers if isinstance(answers, np.ndarray) else self.answer_vector(answers)
+        open_ = vec == 0
+        lo    = self.score_batch(np.where(open_, self.option_min, vec))
+        hi    = self.score_batch(np.where(open_, self.option_max, vec))
+        left  = self.score_batch(open_)
+        return np.array([left[d] > 0 and
+                         score_tier(lo[d], self.dim_max[d])[2] == score_tier(hi[d], self.dim_max[d])[2]
+                         for d in range(len(self.dim_keys))])
+
+    def adaptive_flow(self, order, answers) -> list:
+        """Positions in *order* still part of the quiz: answered, or in a dimension that is not settled."""
+        vec     = answers if isinstance(answers, np.ndarray) else self.answer_vector(answers)
+        settled = self.settled_dims(vec)
+        return [p for p, i in enumerate(order) if vec[i] or not settled[self.sc_dim[i]]]
+
+    def impute_skipped(self, answers) -> np.ndarray:
+        """Answer vector with each settled dimension's skipped scenarios filled in (see above)."""
+        vec     = (answers if isinstance(answers, np.ndarray) else self.answer_vector(answers)).copy()
+        settled = self.settled_dims(vec)
+        for d in np.flatnonzero(settled):
+            own  = self.sc_dim == d
+            mean = vec[own & (vec > 0)].mean()
+            gap  = own & (vec == 0)
+            vec[gap] = np.clip(np.rint(mean), self.option_min[gap], self.option_max[gap])
+        return vec
+
+
+_BANKS      = {}   # content digest -> Bank, for every version compiled in this process
+_BANKS_LOCK = threading.Lock()
+
+def compile_bank(raw: bytes, name: str = "bank") -> Bank:
+    """Parse, validate and compile one bank file's bytes; unchanged content is compiled once."""
+    digest = content_digest(raw)
+    with _BANKS_LOCK:
+        if digest in _BANKS:
+            return _BANKS[digest]
+    try:
+        if name.endswith((".yaml", ".yml")):
+            import yaml   # optional: only needed for YAML banks
+            data = yaml.safe_load(raw)
+        else:
+            data = json.loads(raw)
+    except ImportError:
+        raise BankError(f"{name}: YAML banks need PyYAML (pip install pyyaml)") from None
+    except Exception as e:
+        raise BankError(f"{name}: {e}") from None
+    problems = _bank_problems(data)
+    if problems:
+        raise BankError(f"{name}: " + "; ".join(problems[:8]) + (" …" if len(problems) > 8 else ""))
+    bank = Bank(data, digest)
+    with _BANKS_LOCK:
+        return _BANKS.setdefault(digest, bank)
+
+def bank_by_digest(digest):
+    return _BANKS.get(digest)
+
+def _version_key(bank: Bank) -> tuple:
+    """'1.10' sorts after '1.9'."""
+    return tuple((0, int(p), "") if p.isdigit() else (1, 0, p) for p in re.split(r"[.\-_]", bank.version))
+
+def scan_banks(directory: str = BANK_DIR) -> tuple:
+    """(valid banks oldest → newest version, {file name: error}) for every bank file in *directory*."""
+    banks, errors = [], {}
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if not entry.name.endswith(BANK_EXTS):
+            continue
+        try:
+            with open(entry.path, "rb") as f:
+                banks.append(compile_bank(f.read(), entry.name))
+        except Exception as e:   # one bad file must never take the others (or the app) down
+            errors[entry.name] = str(e) if isinstance(e, (OSError, BankError)) else f"{entry.name}: {e!r}"
+    banks.sort(key=_version_key)
+    return banks, errors
+
+def score_tier(s: float, max_s: float = MAX_SCORE):
+    pct = s / max_s
+    if pct < 0.40: return "Emerging",   "#F97316", 0
+    if pct < 0.60: return "Developing", "#3B82F6", 1
+    if pct < 0.80: return "Proficient", "#10B981", 2
+    return              "Advanced",   "#8B5CF6", 3
+
+# The newest bank in bank/ at import. Long-running servers follow later
+# versions through scan_banks(); the names below are this default bank's.
+_found, _errors = scan_banks()
+if not _found:
+    raise BankError("no valid scenario bank in bank/: " + "; ".join(_errors.values()))
+BANK = _found[-1]
+
+DIMENSIONS     = BANK.dimensions
+LEVEL_LABELS   = BANK.level_labels
+SCENARIOS      = BANK.scenarios
+DIM_KEYS       = BANK.dim_keys
+LEVEL_KEYS     = BANK.level_keys
+SCENARIO_INDEX = BANK.scenario_index
+SC_DIM         = BANK.sc_dim
+SC_LEVEL       = BANK.sc_level
+OPTION_SCORES  = BANK.option_scores
+DIM_ONEHOT     = BANK.dim_onehot
+answer_vector   = BANK.answer_vector
+compute_scores  = BANK.compute_scores
+score_batch     = BANK.score_batch
+level_breakdown = BANK.level_breakdown
+new_answers     = BANK.new_answers
+shuffle_plan    = BANK.shuffle_plan
+settled_dims    = BANK.settled_dims
+adaptive_flow   = BANK.adaptive_flow
+impute_skipped  = BANK.impute_skipped
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SVG CHARTS
+# Static counterparts of the Plotly radar and bar charts: same 0–20 scale,
+# palette and DIMENSIONS colours, but plain SVG strings with no JS bundle,
+# for the offline report and the facilitator's lightweight view.
+# ─────────────────────────────────────────────────────────────────────────────
+RADAR_PALETTE = ["#2563EB","#F59E0B","#10B981","#8B5CF6","#EF4444"]
+
+def _radar_xy(i, n, v, cx, cy, radius):
+    """Position of value *v* (0–20 scale) on axis i of n; first axis at 12 o'clock, clockwise."""
+    a = 2 * math.pi * i / n
+    return cx + radius * v / 20 * math.sin(a), cy - radius * v / 20 * math.cos(a)
+
+def _radar_points(vals, cx, cy, radius):
+    return " ".join("%.1f,%.1f" % _radar_xy(i, len(vals), v, cx, cy, radius)
+                    for i, v in enumerate(vals))
+
+def _svg_radar_frame(size, title, dims):
+    keys   = list(dims.keys())
+    width  = size + 180            # side room for the left/right axis labels
+    cx, cy = width / 2, size / 2 + 24
+    radius = size * 0.30
+    parts  = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {size + 24}" '
+              f'width="100%" style="max-width:{width}px;font-family:DM Sans,sans-serif">',
+              f'<rect width="{width}" height="{size + 24}" fill="white"/>']
+    if title:
+        parts.append(f'<text x="{cx}" y="16" text-anchor="middle" font-size="13" '
+                     f'font-family="Georgia,serif" fill="#1E293B">{escape(title)}</text>')
+    for ring in (5, 10, 15, 20):
+        parts.append(f'<polygon points="{_radar_points([ring] * len(keys), cx, cy, radius)}" '
+                     f'fill="none" stroke="rgba(148,163,184,0.35)"/>')
+        parts.append(f'<text x="{cx + 3}" y="{cy - radius * ring / 20 - 2:.1f}" font-size="9" '
+                     f'fill="#94A3B8">{ring}</text>')
+    for i, k in enumerate(keys):
+        x, y   = _radar_xy(i, len(keys), 20, cx, cy, radius)
+        lx, ly = _radar_xy(i, len(keys), 20, cx, cy, radius + 16)
+        anchor = "middle" if abs(lx - cx) < 1 else ("start" if lx > cx else "end")
+        parts.append(f'<line x1="{cx}" y1="{cy}" x2="{x:.1f}" y2="{y:.1f}" stroke="rgba(148,163,184,0.35)"/>')
+        parts.append(f'<text x="{lx:.1f}" y="{ly + 4:.1f}" text-anchor="{anchor}" font-size="11" '
+                     f'fill="{dims[k]["color"]}" font-weight="600">{escape(dims[k]["name"])}</text>')
+    return parts, cx, cy, radius
+
+def svg_radar(all_scores, title="", size=320, dims=None) -> str:
+    """One filled polygon per profile in *all_scores* (list of {dim: score})."""
+    dims = dims or DIMENSIONS
+    keys = list(dims.keys())
+    parts, cx, cy, radius = _svg_radar_frame(size, title, dims)
+    for i, scores in enumerate(all_scores):
+        c   = RADAR_PALETTE[i % len(RADAR_PALETTE)]
+        pts = _radar_points([scores[k] for k in keys], cx, cy, radius)
+        parts.append(f'<polygon points="{pts}" fill="{c}" fill-opacity="0.12" stroke="{c}" stroke-width="2.5"/>')
+    if len(all_scores) == 1:
+        for i, k in enumerate(keys):
+            x, y = _radar_xy(i, len(keys), all_scores[0][k], cx, cy, radius)
+            parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="4" fill="{dims[k]["color"]}"/>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+def svg_radar_bands(quantiles, title="", size=320, dims=None) -> str:
+    """Median with interquartile and 10th–90th percentile envelopes ({q: {dim: score}})."""
+    dims = dims or DIMENSIONS
+    keys = list(dims.keys())
+    parts, cx, cy, radius = _svg_radar_frame(size, title, dims)
+    ring = lambda q: _radar_points([quantiles[q][k] for k in keys], cx, cy, radius)
+    for lo, hi, alpha in ((0.10, 0.90, 0.12), (0.25, 0.75, 0.28)):
+        parts.append(f'<path d="M{ring(hi)}Z M{ring(lo)}Z" fill-rule="evenodd" '
+                     f'fill="#2563EB" fill-opacity="{alpha}"/>')
+    parts.append(f'<polygon points="{ring(0.50)}" fill="none" stroke="#1E3A8A" stroke-width="2.5"/>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+def svg_bar(scores, width=360, dims=None) -> str:
+    """Horizontal bars on a 0–24 axis, labelled "n/20", in the dimensions' colours."""
+    dims = dims or DIMENSIONS
+    keys, row, left = list(dims.keys()), 40, 150
+    plot  = width - left - 40
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {row * len(keys) + 10}" '
+             f'width="100%" style="max-width:{width}px;font-family:DM Sans,sans-serif">']
+    for tick in (0, 5, 10, 15, 20):
+        x = left + plot * tick / 24
+        parts.append(f'<line x1="{x:.1f}" y1="0" x2="{x:.1f}" y2="{row * len(keys)}" stroke="#E2E8F0"/>')
+    for i, k in enumerate(keys):
+        dim, v = dims[k], scores[k]
+        y, w   = i * row + 8, plot * v / 24
+        parts.append(f'<text x="{left - 8}" y="{y + 16}" text-anchor="end" font-size="11" fill="#334155">'
+                     f'{dim["icon"]} {escape(dim["name"])}</text>')
+        parts.append(f'<rect x="{left}" y="{y}" width="{w:.1f}" height="24" rx="3" fill="{dim["color"]}"/>')
+        parts.append(f'<text x="{left + w + 6:.1f}" y="{y + 16}" font-size="12" fill="#1E293B">{v}/20</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTML REPORT
+# ─────────────────────────────────────────────────────────────────────────────
+def html_report(name, scores, class_code="", dims=None):
+    """Standalone printable report; *dims* is the participant's bank's dimensions (default bank's if None)."""
+    dims = dims or DIMENSIONS
+    now  = datetime.now().strftime("%d %B %Y")
+    meta = name
+    if class_code: meta += f" · {class_code}"
+    meta += f" · {now}"
+    rows = ""
+    for key, dim in dims.items():
+        s              = scores[key]
+        label, lc, ti  = score_tier(s)
+        pct            = (s/20)*100
+        rows += f"""
+        <div style="background:white;border-radius:12px;padding:1.2rem 1.5rem;margin-bottom:1rem;
+                    border-left:5px solid {dim['color']};box-shadow:0 2px 8px rgba(0,0,0,0.07)">
+          <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:6px">
+            <span style="font-weight:700;font-size:1rem">{dim['icon']} {dim['name']}</span>
+            <span style="background:{lc};color:white;padding:3px 12px;border-radius:999px;
+                         font-size:0.73rem;font-weight:700">{label.upper()}</span>
+          </div>
+          <div style="font-size:0.78rem;color:#94A3B8;font-style:italic;margin-bottom:8px">{dim['tagline']}</div>
+          <div style="font-size:1.9rem;font-weight:800;color:#1E293B;font-family:Georgia,serif;margin-bottom:6px">
+            {s}<span style="font-size:1rem;font-weight:400;color:#94A3B8"> / 20</span></div>
+          <div style="background:#E2E8F0;border-radius:999px;height:7px;margin-bottom:10px">
+            <div style="background:{dim['color']};width:{pct:.0f}%;height:7px;border-radius:999px"></div></div>
+          <p style="margin:0;font-size:0.88rem;color:#475569;line-height:1.75">{dim['feedback'][ti]}</p>
+        </div>"""
+    return f"""<!DOCTYPE html>
+<html lang="en"><head>
+<meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
+<title>Boundary Crossing Diagnostic — {name}</title>
+<style>
+  @import url('https://fonts.googleapis.com/css2?family=Lora:wght@400;700&family=DM+Sans:wght@400;500;600&display=swap');
+  body{{font-family:'DM Sans',system-ui,-apple-system,'Segoe UI',sans-serif;max-width:680px;margin:40px auto;padding:0 24px;color:#1E293B;background:#F8FAFC}}
+  .hdr{{background:linear-gradient(135deg,#0F172A,#1E3A8A,#2563EB);border-radius:16px;padding:2.2rem 2rem;color:white;margin-bottom:1.5rem}}
+  .hdr .lbl{{font-size:0.62rem;letter-spacing:3px;text-transform:uppercase;opacity:0.6;margin-bottom:0.6rem}}
+  .hdr h1{{margin:0;font-size:1.7rem;font-family:'Lora',Georgia,serif;font-weight:700}}
+  .hdr .meta{{margin:8px 0 0;opacity:0.8;font-size:0.88rem}}
+  .reflect{{background:#EFF6FF;border-left:4px solid #2563EB;border-radius:8px;padding:1.1rem 1.3rem;margin:1.25rem 0}}
+  .reflect h3{{margin:0 0 0.5rem;color:#1D4ED8;font-size:0.88rem;text-transform:uppercase;letter-spacing:1px}}
+  .reflect p{{margin:0;color:#475569;font-size:0.9rem;line-height:1.75;font-style:italic}}
+  .charts{{display:flex;flex-wrap:wrap;gap:1rem;align-items:center;justify-content:center;
+           background:white;border-radius:12px;padding:1rem;margin-bottom:1rem;box-shadow:0 2px 8px rgba(0,0,0,0.07)}}
+  .charts svg{{flex:1 1 280px}}
+  .footer{{text-align:center;font-size:0.78rem;color:#CBD5E1;margin-top:2rem;padding-top:1rem;border-top:1px solid #E2E8F0}}
+</style></head><body>
+  <div class="hdr">
+    <div class="lbl">MBX · Boundary-Crossing Learning and Leadership · IAL/SUSS</div>
+    <h1>🔀 Boundary Crossing Diagnostic</h1>
+    <div class="meta">{meta}</div>
+  </div>
+  <p style="color:#475569;font-size:0.9rem;line-height:1.75;margin-bottom:1.25rem">
+    Based on your responses to 20 situational scenarios across five organisational levels 
+    (systemic, team, leader–subordinate, individual mindset, and technology). 
+    Scores reflect developmental tendencies, not fixed traits — and are most useful 
+    as a starting point for reflection rather than a final verdict.
+  </p>
+  <div class="charts">{svg_radar([scores], dims=dims)}{svg_bar(scores, dims=dims)}</div>
+  {rows}
+  <div class="reflect">
+    <h3>💭 Reflection Prompt</h3>
+    <p>Which dimension surprised you — either higher or lower than you expected? 
+    Looking at your lowest dimension: which of the five organisational levels 
+    felt most difficult in the scenarios? What does that tell you about 
+    where crossing boundaries is hardest in your current role and context?
+    What is one specific tension you have been managing around rather than attending to?</p>
+  </div>
+  <div class="footer">MBX Boundary Crossing Diagnostic · IAL/SUSS · {now}<br>
+    Inspired by Akkerman &amp; Bakker (2011).</div>
+</body></html>"""
+
+def html_reports(rows, dims=None) -> list:
+    """html_report for each submission row (name, scores, class_code): one pool task per chunk."""
+    return [html_report(r["name"], r["scores"], r.get("class_code", ""), dims) for r in rows]
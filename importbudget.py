@@ -0,0 +1,95 @@
+"""
+Cold-start import budget for the Boundary Crossing Diagnostic.
+
+Runs the app's first rerun — the welcome page a participant sees when a
+fresh container takes its first request — in a new interpreter under
+`python -X importtime`, and attributes every module imported during that
+rerun to the app (Streamlit and its test harness are imported first and
+left out). Fails when those imports exceed the budget, or when one of the
+heavy libraries that only the facilitator view, charts, exports or
+submission need is loaded on the way to the welcome page.
+
+    python importbudget.py                  # default budget, top 15 imports
+    python importbudget.py --budget-ms 150 --top 30
+
+Exit status is 0 within budget, 1 otherwise, so it can gate CI.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+MARKER   = "--- importbudget: app rerun starts ---"
+DEFERRED = ("pandas", "plotly", "pyarrow", "requests")   # must not load before first paint
+
+# The child: import the harness, mark stderr, then run the welcome page once.
+CHILD = f"""
+import sys
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+set_log_level("error")
+print(",".join(m for m in {DEFERRED!r} if m in sys.modules), flush=True)
+print({MARKER!r}, file=sys.stderr, flush=True)
+at = AppTest.from_file({APP_PATH!r}, default_timeout=120)
+at.run()
+if at.exception:
+    raise SystemExit(at.exception[0].message)
+"""
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def measure() -> tuple:
+    """([(top-level module, cumulative µs)], every module imported, deferred modules the harness preloads)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD],
+                          capture_output=True, text=True, cwd=os.path.dirname(APP_PATH))
+    if proc.returncode:
+        raise SystemExit(f"app run failed:\n{proc.stderr[-2000:]}")
+    preloaded = [m for m in proc.stdout.strip().split(",") if m]
+    _, _, after = proc.stderr.partition(MARKER)
+    imports, names = [], set()
+    for m in LINE.finditer(after):
+        names.add(m.group(4))
+        if not m.group(3):   # nested imports are already in their parent's cumulative time
+            imports.append((m.group(4), int(m.group(2))))
+    return imports, names, preloaded
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--budget-ms", type=float, default=350,
+                    help="allowed import time for the first rerun (default: %(default)s)")
+    ap.add_argument("--top", type=int, default=15, help="slowest imports to list (default: %(default)s)")
+    args = ap.parse_args()
+
+    imports, names, preloaded = measure()
+    total_ms = sum(us for _, us in imports) / 1000
+    leaked   = sorted({name.split(".")[0] for name in names} & set(DEFERRED))
+
+    print(f"{'module':<40} {'cumulative ms':>14}")
+    print("─" * 55)
+    for name, us in sorted(imports, key=lambda x: -x[1])[:args.top]:
+        print(f"{name:<40} {us / 1000:>14.1f}")
+    print("─" * 55)
+    print(f"{'total (' + str(len(imports)) + ' top-level imports)':<40} {total_ms:>14.1f}   "
+          f"budget {args.budget_ms:.0f} ms")
+    if preloaded:
+        print(f"not checked (the test harness imports them itself): {', '.join(preloaded)}")
+
+    failed = False
+    if leaked:
+        print(f"FAIL: welcome page imports {', '.join(leaked)}; import them where they are used")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.0f} ms of imports is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Concurrent-session load test for the Boundary Crossing Diagnostic.
+
+Drives N simulated participants at once through welcome → 20 scenarios →
+results → submit with Streamlit's headless AppTest, all inside this one
+process — the same way a single `streamlit run` server runs every session's
+script on its own thread against shared cache_resource state. Submissions
+go to a throwaway SQLite class store and to a local stand-in for the Google
+Sheets web app, so nothing leaves the machine.
+
+    python loadtest.py                       # levels 1, 10, 50, 100, 200
+    python loadtest.py --levels 1,25,300 --json results.json
+
+For each concurrency level it reports p50/p95/p99 rerun latency (one
+AppTest.run per click, as a browser would trigger), wall time, peak RSS of
+the process, and growth of the class store (rows and bytes on disk).
+"""
+
+import argparse
+import contextlib
+import http.server
+import json
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+from streamlit import config
+from streamlit.logger import set_log_level
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SHEETS STUB
+# Accepts the same JSON body as the Apps Script snippet (one row per post)
+# and counts what it received.
+# ─────────────────────────────────────────────────────────────────────────────
+class SheetsStub(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        self.rows = self.posts = 0
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _SheetsHandler)
+        threading.Thread(target=self.serve_forever, name="sheets-stub", daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/exec"
+
+
+class _SheetsHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.posts += 1
+            self.server.rows  += 1 if isinstance(body, dict) else 0
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SHARED RUNTIME
+# A real server has one Runtime, one ScriptCache, one config and one set of
+# secrets for every session. AppTest instead patches them in per run and
+# restores them afterwards — clearing the global Runtime or config override
+# under sessions still running on other threads, and recompiling app.py each
+# time, which CPython 3.11 cannot do safely from several threads at once.
+# Pin all four for the process.
+# ─────────────────────────────────────────────────────────────────────────────
+def _share_runtime(secrets: dict):
+    pinned = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            pinned[:] = [cls._instance]
+        elif not pinned:
+            raise RuntimeError("Runtime hasn't been created!")
+        return cls._instance or pinned[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists   = classmethod(lambda cls: cls._instance is not None or bool(pinned))
+    config.set_option("global.appTest", True)
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = app_test.ScriptCache = lambda: script_cache
+    # Left empty on each AppTest so it never swaps st.secrets mid-run.
+    st.secrets = Secrets()
+    st.secrets._secrets = secrets
+
+# ─────────────────────────────────────────────────────────────────────────────
+# PARTICIPANT
+# ─────────────────────────────────────────────────────────────────────────────
+def _timed(at, latencies):
+    t0 = time.perf_counter()
+    at.run()
+    latencies.append(time.perf_counter() - t0)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+def _button(at, *labels):
+    return next(b for b in at.button if b.label.startswith(labels))
+
+def participant(pid: int, class_code: str, latencies: list, timeout: float):
+    """One full pass through the app; appends every rerun's wall time to *latencies*."""
+    rng = random.Random(pid)
+    at  = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    _timed(at, latencies)
+    at.text_input[0].input(f"Participant {pid:04d}")
+    at.text_input[1].input(class_code)
+    _button(at, "Begin").click()
+    _timed(at, latencies)
+    while at.session_state["page"] == "quiz":
+        radio = at.radio[0]
+        radio.set_value(rng.choice(radio.options))
+        _timed(at, latencies)
+        _button(at, "Next", "See My Results").click()
+        _timed(at, latencies)
+    _button(at, "✅ Submit").click()
+    _timed(at, latencies)
+    if not all(at.session_state["answers"]) or not at.session_state["submitted"]:
+        raise RuntimeError(f"participant {pid} did not finish")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RUN
+# ─────────────────────────────────────────────────────────────────────────────
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def _store_size(path):
+    with sqlite3.connect(path) as db:
+        rows = db.execute("SELECT COUNT(*) FROM submissions").fetchone()[0]
+    size = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    return rows, size
+
+def run_level(n: int, store_path: str, timeout: float) -> dict:
+    latencies, errors = [], []
+    rows0, bytes0 = _store_size(store_path)
+
+    def worker(pid):
+        try:
+            participant(pid, f"LOAD-{n}", latencies, timeout)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    rows1, bytes1 = _store_size(store_path)
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]).tolist()
+    return {
+        "participants": n, "reruns": len(latencies), "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "wall_s": wall,
+        "reruns_per_s": len(latencies) / wall, "peak_rss_mb": _peak_rss_mb(),
+        "store_rows": rows1 - rows0, "store_kb": (bytes1 - bytes0) / 1024,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--levels", default="1,10,50,100,200",
+                    help="comma-separated concurrency levels (default: %(default)s)")
+    ap.add_argument("--timeout", type=float, default=120,
+                    help="per-rerun timeout in seconds (default: %(default)s)")
+    ap.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args   = ap.parse_args()
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+
+    set_log_level("error")   # one deprecation warning per rerun would drown the table
+    stub = SheetsStub()
+    tmp  = tempfile.mkdtemp(prefix="bc-loadtest-")
+    db   = os.path.join(tmp, "class_store.db")
+    _share_runtime({"CLASS_STORE": "sqlite", "CLASS_STORE_PATH": db,
+                    "GOOGLE_SHEET_URL": stub.url})
+    participant(-1, "WARMUP", [], args.timeout)   # compile, import and fill caches once
+
+    head = (f"{'sessions':>8} {'reruns':>7} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'reruns/s':>9} {'peak RSS MB':>12} {'store +rows':>12} {'store +KB':>10}")
+    print(head)
+    print("─" * len(head))
+    results = []
+    for n in levels:
+        r = run_level(n, db, args.timeout)
+        results.append(r)
+        print(f"{r['participants']:>8} {r['reruns']:>7} {r['errors']:>4} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['reruns_per_s']:>9.1f} "
+              f"{r['peak_rss_mb']:>12.1f} {r['store_rows']:>12} {r['store_kb']:>10.1f}", flush=True)
+        if r["first_error"]:
+            print(f"         first error: {r['first_error']}")
+
+    deadline = time.time() + 15
+    while stub.rows < sum(r["store_rows"] for r in results) + 1 and time.time() < deadline:
+        time.sleep(0.2)
+    print(f"\nSheets stub: {stub.rows} rows in {stub.posts} posts")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"levels": results, "sheets_rows": stub.rows, "sheets_posts": stub.posts}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
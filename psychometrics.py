@@ -0,0 +1,73 @@
+"""
+Item analysis for the Boundary Crossing Diagnostic.
+
+Works on the de-identified item-level response log: an (n, scenarios) int8
+matrix in bank order holding each respondent's option score, the same
+layout as a session's packed answers, for the Bank the responses were
+given against (the default bank if omitted). Every statistic is a handful
+of NumPy reductions over the whole matrix, so 100k respondents take well
+under a second. Plain NumPy, no Streamlit.
+"""
+
+import numpy as np
+
+from diagnostic import BANK
+
+
+def _complete(matrix, bank=BANK) -> np.ndarray:
+    """Rows with every scenario answered, as float64 for the moment sums."""
+    X = np.asarray(matrix, dtype=np.int8).reshape(-1, len(bank.scenarios))
+    return X[(X > 0).all(axis=1)].astype(np.float64)
+
+
+def cronbach_alpha(X: np.ndarray, bank=BANK) -> np.ndarray:
+    """Alpha per dimension (dim_keys order): k/(k-1) · (1 − Σ item variances / total variance)."""
+    n_dims    = len(bank.dim_keys)
+    item_var  = X.var(axis=0, ddof=1)
+    total_var = bank.score_batch(X).var(axis=0, ddof=1)
+    k         = np.bincount(bank.sc_dim, minlength=n_dims)
+    sum_var   = np.bincount(bank.sc_dim, weights=item_var, minlength=n_dims)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total_var > 0, k / (k - 1) * (1 - sum_var / total_var), np.nan)
+
+
+def item_total(X: np.ndarray, bank=BANK) -> np.ndarray:
+    """Corrected item–total correlation: each item against its dimension total without itself."""
+    Xc  = X - X.mean(axis=0)
+    T   = bank.score_batch(X)[:, bank.sc_dim]   # each item's own dimension total
+    Tc  = T - T.mean(axis=0)
+    n1  = len(X) - 1
+    var_x  = (Xc * Xc).sum(axis=0) / n1
+    var_t  = (Tc * Tc).sum(axis=0) / n1
+    cov_xt = (Xc * Tc).sum(axis=0) / n1
+    cov    = cov_xt - var_x                   # cov(x, T − x)
+    var_r  = var_t - 2 * cov_xt + var_x       # var(T − x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where((var_x > 0) & (var_r > 0), cov / np.sqrt(var_x * var_r), np.nan)
+
+
+def option_frequencies(X: np.ndarray, bank=BANK) -> np.ndarray:
+    """scenarios × options share of respondents choosing each option, options in authored order."""
+    n_sc, n_opt = bank.option_scores.shape
+    flat   = (np.arange(n_sc) * (n_opt + 1) + X.astype(np.intp)).ravel()
+    counts = np.bincount(flat, minlength=n_sc * (n_opt + 1)).reshape(n_sc, n_opt + 1)
+    by_opt = np.take_along_axis(counts, bank.option_scores.astype(np.intp), axis=1)   # score -> option
+    return by_opt / max(len(X), 1)
+
+
+def dimension_correlations(X: np.ndarray, bank=BANK) -> np.ndarray:
+    """dims × dims Pearson correlations of the dimension totals."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.atleast_2d(np.corrcoef(bank.score_batch(X), rowvar=False))
+
+
+def analyse(matrix, bank=BANK) -> dict:
+    """Every statistic above for *matrix*; incomplete rows are dropped, and correlations
+    need at least two respondents (NaN otherwise)."""
+    X, n_dims = _complete(matrix, bank), len(bank.dim_keys)
+    if len(X) < 2:
+        return {"n": len(X), "alpha": np.full(n_dims, np.nan),
+                "item_total": np.full(len(bank.scenarios), np.nan),
+                "options": option_frequencies(X, bank), "dim_corr": np.full((n_dims, n_dims), np.nan)}
+    return {"n": len(X), "alpha": cronbach_alpha(X, bank), "item_total": item_total(X, bank),
+            "options": option_frequencies(X, bank), "dim_corr": dimension_correlations(X, bank)}